@@ -0,0 +1,285 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Headless benchmark of the tracing overhead of the debugger.
+
+Runs the workloads from workloads.py untraced and under the debugger engine
+(no QGIS and no display needed) for each available tracing backend:
+
+  idle         debugger enabled, no breakpoints
+  other_file   a breakpoint in a file that the workload does not run
+  cold_line    a breakpoint in the workload's hot function that is never reached
+  step_over    stepping over the workload call
+  run_to       run to cursor over the workload call
+
+Overhead is reported per executed line and per call of the workload (counted
+in a separate run, only for workloads with many calls), e.g.
+
+  python benchmarks/bench_debugger.py --output bench_output.txt
+"""
+
+import argparse
+import inspect
+import json
+import sys
+import time
+
+import workloads
+from common import best_of, register_package, report_header
+
+register_package()
+from firstaid import tracing  # noqa: E402  pylint: disable=wrong-import-position
+from firstaid.breakpoints import Breakpoint  # noqa: E402  pylint: disable=wrong-import-position
+from firstaid.debugger import Debugger  # noqa: E402  pylint: disable=wrong-import-position
+
+SCENARIOS = ["idle", "other_file", "cold_line", "step_over", "run_to"]
+# overhead per call is only reported for workloads making at least this many
+# calls - for a single call it is just the whole overhead
+MIN_CALLS = 100
+
+
+def _marker_line(function, marker):
+    """line number of the line with the given "# bench: ..." comment in the function"""
+    lines, first_line = inspect.getsourcelines(function)
+    for i, line in enumerate(lines):
+        if line.rstrip().endswith("# bench: " + marker):
+            return first_line + i
+    raise ValueError("no '{}' marker in {}".format(marker, function.__name__))
+
+
+def _unused():
+    return None  # breakpoint of the other_file scenario - never executed
+
+
+class BenchFrontend:
+    """Replaces the debugger window: instead of waiting for the user, each stop
+    runs the next scripted action and stops are timestamped."""
+
+    def __init__(self):
+        self.debugger = None
+        self.actions = []
+        self.stop_times = []
+
+    def debugger_stopped(self, frame, filename):
+        self.stop_times.append(time.perf_counter())
+        if self.actions:
+            self.actions.pop(0)()
+        else:
+            self.debugger.resume()
+
+    def debugger_resumed(self):
+        pass
+
+
+def count_events(workload):
+    """number of line and call events of the workload (as seen by sys.settrace)"""
+    counts = {"line": 0, "call": 0}
+
+    def trace(frame, event, arg):
+        if event in counts:
+            counts[event] += 1
+        return trace
+
+    sys.settrace(trace)
+    try:
+        workload()
+    finally:
+        sys.settrace(None)
+    return counts["line"], counts["call"]
+
+
+def time_untraced(workload):
+    start = time.perf_counter()
+    workload()
+    return time.perf_counter() - start
+
+
+def time_scenario(backend, scenario, workload_name):
+    """run the workload once in the scenario and return the measured time
+    (or None if the backend is not available)"""
+    workload = workloads.WORKLOADS[workload_name]
+    frontend = BenchFrontend()
+    debugger = Debugger(frontend, backend)
+    frontend.debugger = debugger
+    if debugger.backend.name != backend:
+        return None
+
+    driver_file = debugger.paths.canonical(workloads.__file__)
+    debugger.breakpoints.file_breakpoints(driver_file)  # as if opened in the window
+
+    if scenario == "other_file":
+        this_file = debugger.paths.canonical(__file__)
+        line_no = inspect.getsourcelines(_unused)[1] + 1
+        debugger.breakpoints.file_breakpoints(this_file)[line_no] = Breakpoint(
+            this_file, line_no
+        )
+    elif scenario == "cold_line":
+        line_no = _marker_line(workloads.COLD_FUNCTIONS[workload_name], "cold")
+        debugger.breakpoints.file_breakpoints(driver_file)[line_no] = Breakpoint(
+            driver_file, line_no
+        )
+    elif scenario in ("step_over", "run_to"):
+        line_no = _marker_line(workloads.driver, "stop")
+        debugger.breakpoints.file_breakpoints(driver_file)[line_no] = Breakpoint(
+            driver_file, line_no
+        )
+        target_line = _marker_line(workloads.driver, "target")
+        if scenario == "step_over":
+            # first step gets to the workload call, the second one steps over it
+            frontend.actions = [debugger.step_over, debugger.step_over]
+        else:
+            frontend.actions = [lambda: debugger.run_to(driver_file, target_line)]
+
+    debugger.set_enabled(True)
+    try:
+        if scenario in ("step_over", "run_to"):
+            workloads.driver(workload)
+            expected_stops = 3 if scenario == "step_over" else 2
+            if len(frontend.stop_times) != expected_stops:
+                raise RuntimeError(
+                    "{}: {} stops instead of {}".format(
+                        scenario, len(frontend.stop_times), expected_stops
+                    )
+                )
+            # from the last stop before the workload call to the stop after it
+            return frontend.stop_times[-1] - frontend.stop_times[-2]
+
+        start = time.perf_counter()
+        workload()
+        elapsed = time.perf_counter() - start
+        if frontend.stop_times:
+            raise RuntimeError("{}: unexpected stop".format(scenario))
+        return elapsed
+    finally:
+        debugger.set_enabled(False)
+        sys.settrace(None)
+
+
+def available_backends():
+    backends = [tracing.SetTraceBackend.name]
+    if tracing.MonitoringBackend.is_available():
+        backends.append(tracing.MonitoringBackend.name)
+    return backends
+
+
+def run_benchmarks(backends, workload_names, scenarios, repeat):
+    results = []
+    for workload_name in workload_names:
+        workload = workloads.WORKLOADS[workload_name]
+        workload()  # warm up: caches, specialized bytecode
+        lines, calls = count_events(workload)
+        baseline = best_of(repeat, lambda: time_untraced(workload))
+        results.append(
+            {
+                "workload": workload_name,
+                "backend": None,
+                "scenario": "untraced",
+                "seconds": baseline,
+                "lines": lines,
+                "calls": calls,
+            }
+        )
+        for backend in backends:
+            for scenario in scenarios:
+                seconds = best_of(
+                    repeat,
+                    lambda: time_scenario(backend, scenario, workload_name),
+                )
+                if seconds is None:
+                    continue
+                overhead = seconds - baseline
+                results.append(
+                    {
+                        "workload": workload_name,
+                        "backend": backend,
+                        "scenario": scenario,
+                        "seconds": seconds,
+                        "lines": lines,
+                        "calls": calls,
+                        "slowdown": seconds / baseline,
+                        "overhead_per_line_ns": overhead / lines * 1e9,
+                        "overhead_per_call_ns": (
+                            overhead / calls * 1e9 if calls >= MIN_CALLS else None
+                        ),
+                    }
+                )
+    return results
+
+
+def print_table(results):
+    print(
+        "{:<14} {:<11} {:<11} {:>10} {:>9} {:>12} {:>12}".format(
+            "workload", "backend", "scenario", "ms", "slowdown", "ns/line", "ns/call"
+        )
+    )
+    for r in results:
+        if r["backend"] is None:
+            print(
+                "{:<14} {:<11} {:<11} {:>10.2f}".format(
+                    r["workload"], "-", r["scenario"], r["seconds"] * 1000
+                )
+            )
+            continue
+        per_call = r["overhead_per_call_ns"]
+        print(
+            "{:<14} {:<11} {:<11} {:>10.2f} {:>8.2f}x {:>12.1f} {:>12}".format(
+                r["workload"],
+                r["backend"],
+                r["scenario"],
+                r["seconds"] * 1000,
+                r["slowdown"],
+                r["overhead_per_line_ns"],
+                "-" if per_call is None else "{:.1f}".format(per_call),
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=[tracing.SetTraceBackend.name, tracing.MonitoringBackend.name],
+        help="tracing backend to measure (default: all available)",
+    )
+    parser.add_argument(
+        "--workload",
+        action="append",
+        choices=sorted(workloads.WORKLOADS),
+        help="workload to run (default: all)",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="scenario to run (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each case")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.backend or available_backends(),
+        args.workload or list(workloads.WORKLOADS),
+        args.scenario or SCENARIOS,
+        args.repeat,
+    )
+    print_table(results)
+
+    if args.output:
+        report = report_header(args.repeat)
+        report["results"] = results
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Throughput of syntax highlighting of the source views in lines per second.
+
+  qsci_lexer   plain QsciScintilla with QsciLexerPython
+  source_view  SourceView of the plugin (QgsCodeEditorPython - the lexer, fonts
+               and colors set up by QGIS), as used by the debugger
+
+Text is set and the whole document is styled at once (SCI_COLOURISE), which is
+the worst case - normally Scintilla styles only the visible part. Needs the Qt
+bindings of QGIS (no display needed - the offscreen platform is used), the
+source_view case also needs qgis.gui. By default a large module is made of the
+plugin's own sources, e.g.
+
+  python benchmarks/bench_highlighter.py --output bench_output.txt
+  python benchmarks/bench_highlighter.py /path/to/resources_rc.py
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from common import best_of, register_package, report_header, root_dir
+
+register_package()
+
+_app = None  # QApplication must be kept alive while editors exist
+
+
+def default_source(min_lines=30000):
+    """the plugin's sources repeated to get a large module"""
+    sources = []
+    for filename in sorted(glob.glob(os.path.join(root_dir, "firstaid", "*.py"))):
+        with open(filename, encoding="utf-8") as f:
+            sources.append(f.read())
+    text = "\n".join(sources)
+    return "\n".join([text] * (min_lines // text.count("\n") + 1))
+
+
+def qsci_lexer_editor():
+    from qgis.PyQt.Qsci import QsciLexerPython, QsciScintilla  # pylint: disable=import-outside-toplevel
+
+    editor = QsciScintilla()
+    editor.setLexer(QsciLexerPython(editor))
+    return editor
+
+
+def source_view_editor():
+    from firstaid.sourceview import SourceView  # pylint: disable=import-outside-toplevel
+
+    return SourceView()
+
+
+def editors():
+    """factories of the editors to compare, or None if Qt is not available"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from qgis.PyQt.QtWidgets import QApplication  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        print("Skipping: {}".format(e), file=sys.stderr)
+        return None
+
+    global _app  # pylint: disable=global-statement
+    _app = QApplication.instance() or QApplication(sys.argv)
+    factories = {"qsci_lexer": qsci_lexer_editor}
+    try:
+        import qgis.gui  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+    except ImportError as e:
+        print("Skipping source_view: {}".format(e), file=sys.stderr)
+    else:
+        factories["source_view"] = source_view_editor
+    return factories
+
+
+def time_editor(factory, text):
+    from qgis.PyQt.Qsci import QsciScintilla  # pylint: disable=import-outside-toplevel
+
+    editor = factory()
+    start = time.perf_counter()
+    editor.setText(text)
+    editor.SendScintilla(QsciScintilla.SCI_COLOURISE, 0, -1)
+    return time.perf_counter() - start
+
+
+def run_benchmarks(name, text, repeat, factories):
+    lines = text.count("\n") + 1
+    results = []
+    for method, factory in factories.items():
+        seconds = best_of(repeat, lambda: time_editor(factory, text))
+        results.append(
+            {
+                "source": name,
+                "method": method,
+                "lines": lines,
+                "seconds": seconds,
+                "lines_per_second": lines / seconds,
+            }
+        )
+    return results
+
+
+def print_table(results):
+    print(
+        "{:<30} {:<12} {:>8} {:>10} {:>12}".format(
+            "source", "method", "lines", "ms", "lines/s"
+        )
+    )
+    for r in results:
+        print(
+            "{:<30} {:<12} {:>8} {:>10.1f} {:>12.0f}".format(
+                r["source"][-30:],
+                r["method"],
+                r["lines"],
+                r["seconds"] * 1000,
+                r["lines_per_second"],
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="Python files to highlight")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each case")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    factories = editors()
+    if factories is None:
+        return 1
+
+    results = []
+    if args.files:
+        for filename in args.files:
+            with open(filename, encoding="utf-8", errors="replace") as f:
+                results += run_benchmarks(filename, f.read(), args.repeat, factories)
+    else:
+        results += run_benchmarks(
+            "firstaid sources", default_source(), args.repeat, factories
+        )
+    print_table(results)
+
+    if args.output:
+        report = report_header(args.repeat)
+        report["results"] = results
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Helpers shared by the benchmarks"""
+
+import gc
+import os
+import platform
+import sys
+import types
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def register_package():
+    """Make firstaid.* modules importable without the plugin's __init__ (which needs
+    QGIS), so that the Qt-free parts can be benchmarked anywhere"""
+    if "firstaid" not in sys.modules:
+        package = types.ModuleType("firstaid")
+        package.__path__ = [os.path.join(root_dir, "firstaid")]
+        sys.modules["firstaid"] = package
+
+
+def best_of(repeat, run):
+    """shortest of the measured times - the least disturbed by the rest of the system"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        times.append(run())
+    return min(times)
+
+
+def plugin_version():
+    with open(
+        os.path.join(root_dir, "firstaid", "metadata.txt"), encoding="utf-8"
+    ) as f:
+        for line in f:
+            if line.startswith("version="):
+                return line.strip().split("=", 1)[1]
+    return None
+
+
+def report_header(repeat):
+    """common part of the JSON reports"""
+    return {
+        "plugin_version": plugin_version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+    }
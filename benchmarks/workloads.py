@@ -0,0 +1,109 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Workloads traced by bench_debugger.py.
+
+Lines marked with "# bench: cold" are never executed - a breakpoint there makes
+the debugger trace the whole function without ever stopping. Do not move code
+around without a reason: results are only comparable for the same workloads.
+"""
+
+import random
+
+
+def fact(n):
+    if n < 0:
+        raise ValueError(n)  # bench: cold
+    res = n
+    if n > 1:
+        res *= fact(n - 1)
+    return res
+
+
+def quicksort(lst):
+    if len(lst) < 2:
+        return lst
+    pivot_index = len(lst) // 2
+    pivot = lst[pivot_index]
+    lower = [x for x in lst if x < pivot]
+    higher = [x for x in lst if x > pivot]
+    sorted_lower = quicksort(lower)
+    sorted_higher = quicksort(higher)
+    return sorted_lower + [pivot] + sorted_higher
+
+
+def recursive():
+    """fact() and quicksort() from test_script.py, just more of them"""
+    items = random.Random(42).sample(range(100000), 5000)
+    total = 0
+    for _ in range(200):
+        total += fact(100) % 7
+    return total + len(quicksort(items))
+
+
+def numeric_loop(n=300000):
+    total = 0
+    for i in range(n):
+        if i < 0:
+            total = -1  # bench: cold
+        total += i * i % 7
+    return total
+
+
+def _chain(depth):
+    if depth < 0:
+        return -1  # bench: cold
+    if depth == 0:
+        return 0
+    return _chain(depth - 1) + 1
+
+
+def deep_calls(depth=800, repeat=100):
+    total = 0
+    for _ in range(repeat):
+        total += _chain(depth)
+    return total
+
+
+def _add(a, b):
+    if a is None:
+        return b  # bench: cold
+    return a + b
+
+
+def small_calls(n=200000):
+    total = 0
+    for i in range(n):
+        total = _add(total, i)
+    return total
+
+
+WORKLOADS = {
+    "recursive": recursive,
+    "numeric_loop": numeric_loop,
+    "deep_calls": deep_calls,
+    "small_calls": small_calls,
+}
+
+# the function containing the cold line of each workload
+COLD_FUNCTIONS = {
+    "recursive": fact,
+    "numeric_loop": numeric_loop,
+    "deep_calls": _chain,
+    "small_calls": _add,
+}
+
+
+def driver(workload):
+    """stepping scenarios stop at the first line and step over the workload call"""
+    result = None  # bench: stop
+    result = workload()  # bench: step
+    return result  # bench: target
@@ -2,12 +2,13 @@ import os
 
 import qgis.utils  # pylint: disable=import-error
 from qgis.PyQt import sip  # pylint: disable=import-error
-from qgis.PyQt.QtCore import QMetaObject, QObject, QThread, Qt, pyqtSlot  # pylint: disable=import-error
+from qgis.PyQt.QtCore import QMetaObject, QObject, QSettings, QThread, Qt, pyqtSlot  # pylint: disable=import-error
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QApplication  # pylint: disable=import-error
 
 from .debuggerwidget import DebuggerWidget
 from .debugwidget import DebugDialog
+from .exceptionqueue import MAX_ENTRIES, REPEAT_INTERVAL, ExceptionQueue
 
 # -----------------------------------------------------------
 # Copyright (C) 2015 Martin Dobias
@@ -22,17 +23,29 @@ from .debugwidget import DebugDialog
 
 dw = None  # pylint: disable=invalid-name
 deferred_dw_handler = None  # pylint: disable=invalid-name
+exception_queue = None  # pylint: disable=invalid-name
 
 
 def show_debug_widget(debug_widget_data):
     """Opens exception dialog with data from debug_widget_data - should be tuple (etype, value, tb).
     Must be called from main thread."""
+    if exception_queue.add(debug_widget_data):
+        show_queued_exceptions()
+
+
+def show_queued_exceptions():
+    """Opens exception dialog with the queued exceptions, or lets the open dialog know
+    that there are new ones. Must be called from main thread."""
     global dw  # pylint: disable=global-statement disable=invalid-name
     if dw is not None and not sip.isdeleted(dw):
         if dw.isVisible():
-            return  # pass this exception while previous is being inspected
+            dw.queue_changed()  # the user pages through exceptions in the dialog
+            return
 
-    dw = DebugDialog(debug_widget_data)
+    entries = exception_queue.snapshot()
+    if not entries:
+        return
+    dw = DebugDialog(entries[0].exc_info, exception_queue=exception_queue)
     dw.show()
     dw.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
 
@@ -48,12 +61,13 @@ class DeferredExceptionObject(QObject):  # pylint: disable=too-few-public-method
 
     def __init__(self, parent=None):
         QObject.__init__(self, parent)
-        self.debug_widget_data = None
+        self.scheduled = False  # start_deferred() has been requested already
 
     @pyqtSlot()
     def start_deferred(self):
         """slot that gets run in main thread - safe to use GUI code"""
-        show_debug_widget(self.debug_widget_data)
+        self.scheduled = False
+        show_queued_exceptions()
 
 
 def showException(etype, value, tb, msg, *args, **kwargs):  # pylint: disable=unused-argument disable=invalid-name
@@ -61,11 +75,17 @@ def showException(etype, value, tb, msg, *args, **kwargs):  # pylint: disable=un
         # we can show the exception directly
         show_debug_widget((etype, value, tb))
     else:
-        # we need to pass the exception details to main thread - we can't do GUI stuff here
-        deferred_dw_handler.debug_widget_data = (etype, value, tb)
-        QMetaObject.invokeMethod(
-            deferred_dw_handler, "start_deferred", Qt.ConnectionType.QueuedConnection
-        )
+        # the exception is queued, main thread shows it - we can't do GUI stuff here
+        if (
+            exception_queue.add((etype, value, tb))
+            and not deferred_dw_handler.scheduled
+        ):
+            deferred_dw_handler.scheduled = True
+            QMetaObject.invokeMethod(
+                deferred_dw_handler,
+                "start_deferred",
+                Qt.ConnectionType.QueuedConnection,
+            )
 
 
 def classFactory(iface):  # pylint: disable=invalid-name
@@ -85,13 +105,23 @@ class FirstAidPlugin:
         if report_plugin_active:
             qgis.utils.unloadPlugin(report_plugin)
 
-        # hook to exception handling
-        self.old_show_exception = qgis.utils.showException
-        qgis.utils.showException = showException
-
         global deferred_dw_handler  # pylint: disable=global-statement disable=invalid-name
         deferred_dw_handler = DeferredExceptionObject(qgis.utils.iface.mainWindow())
 
+        global exception_queue  # pylint: disable=global-statement disable=invalid-name
+        settings = QSettings()
+        exception_queue = ExceptionQueue(
+            int(settings.value("/plugins/firstaid/max-queued-exceptions", MAX_ENTRIES)),
+            float(settings.value("/plugins/firstaid/repeat-interval", REPEAT_INTERVAL)),
+            # QSettings may return booleans as strings
+            str(settings.value("/plugins/firstaid/suppress-repeats", False)).lower()
+            == "true",
+        )
+
+        # hook to exception handling - once the handler has what it needs
+        self.old_show_exception = qgis.utils.showException
+        qgis.utils.showException = showException
+
         icon = QIcon(os.path.join(os.path.dirname(__file__), "icons", "bug.svg"))  # pylint: disable=undefined-variable
         self.action_debugger = QAction(
             icon, "Debug (Ctrl + F12)", qgis.utils.iface.mainWindow()
@@ -0,0 +1,110 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Breakpoints of the debugger - kept free of any GUI code, so that deciding
+whether to stop at a breakpoint (condition, hit counters) is cheap."""
+
+
+def compile_condition(condition):
+    """code of a condition expression, raises SyntaxError if it is not valid"""
+    return compile(condition, "<breakpoint condition>", "eval")
+
+
+def compile_log_message(message):
+    """code of a logpoint's message template (f-string),
+    raises SyntaxError if it is not valid"""
+    return compile("f" + repr(message), "<logpoint>", "eval")
+
+
+class Breakpoint:
+    def __init__(self, filename, line_no):
+        self.filename = filename  # canonical path
+        self.line_no = line_no  # 1-based, as in frame.f_lineno
+        self.condition = None  # expression as entered by the user
+        self.condition_code = None  # ... and compiled just once
+        self.ignore_count = 0  # do not stop for the first N hits
+        self.every_nth = 1  # then stop only at every Nth hit
+        self.hits = 0  # how many times reached (with condition satisfied)
+        self.log_message = None  # logpoint: message template instead of stopping
+        self.log_code = None  # ... compiled as f-string just once
+
+    def set_condition(self, condition):
+        """Set condition expression (empty string or None to remove it).
+        Raises SyntaxError if the expression is not valid."""
+        if condition:
+            self.condition_code = compile_condition(condition)
+            self.condition = condition
+        else:
+            self.condition_code = None
+            self.condition = None
+
+    def set_log_message(self, message):
+        """Turn the breakpoint into a logpoint (empty string or None to turn it back).
+        The message is a f-string template, e.g. "i = {i}, total = {total:.2f}".
+        Raises SyntaxError if the template is not valid."""
+        if message:
+            self.log_code = compile_log_message(message)
+            self.log_message = message
+        else:
+            self.log_code = None
+            self.log_message = None
+
+    def is_logpoint(self):
+        return self.log_code is not None
+
+    def format_log_message(self, frame):
+        """Evaluate the message template of a logpoint in the frame"""
+        try:
+            return eval(self.log_code, frame.f_globals, frame.f_locals)
+        except Exception as e:
+            return "<{}: {}>".format(type(e).__name__, e)
+
+    def is_conditional(self):
+        return (
+            self.condition_code is not None
+            or self.ignore_count > 0
+            or self.every_nth > 1
+        )
+
+    def should_stop(self, frame):
+        """Evaluate condition and counters when the breakpoint is reached in the frame"""
+        if self.condition_code is not None:
+            try:
+                if not eval(self.condition_code, frame.f_globals, frame.f_locals):
+                    return False
+            except Exception:
+                return True  # better to stop and let the user see what is wrong
+
+        self.hits += 1
+        if self.hits <= self.ignore_count:
+            return False
+        return (self.hits - self.ignore_count) % self.every_nth == 0
+
+
+class BreakpointRegistry:
+    """Breakpoints of all files: canonical path -> { line number -> Breakpoint }"""
+
+    def __init__(self):
+        self.files = {}
+
+    def file_breakpoints(self, filename):
+        """dictionary of breakpoints of the file (live - shared with the registry)"""
+        return self.files.setdefault(filename, {})
+
+    def get(self, filename, line_no):
+        file_bps = self.files.get(filename)
+        return file_bps.get(line_no) if file_bps else None
+
+    def remove_file(self, filename):
+        self.files.pop(filename, None)
+
+    def has_breakpoints(self):
+        return any(self.files.values())
@@ -0,0 +1,275 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Core of the debugger - breakpoints, stepping and tracing, without any GUI code.
+
+The front end (the debugger window, or a benchmark script) gets notified through
+debugger_stopped(frame, filename) - which should block until the user resumes
+execution - and debugger_resumed(). Worker threads picked by the user may stop
+too: the front end is then told with debugger_stopped_in_thread(frame, filename)
+from the worker thread, which blocks on an event until resumed from the GUI.
+"""
+
+import dis
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from .breakpoints import Breakpoint, BreakpointRegistry
+from .logpoints import LogBuffer
+from .pathcache import PathCache
+from .tracing import SetTraceBackend, create_backend
+
+
+MAX_BP_CODES = 100000  # code objects in the breakpoint index at most
+
+
+def format_frame(frame):
+    return "<FRAME %s:%d :: %s>" % (
+        frame.f_code.co_filename,
+        frame.f_lineno,
+        frame.f_code.co_name,
+    )
+
+
+def format_frames(frame):
+    if frame.f_back is not None:
+        ret = format_frames(frame.f_back) + "\n"
+    else:
+        ret = ""
+    ret += format_frame(frame)
+    return ret
+
+
+def code_lines(code):
+    """set of line numbers that have bytecode in the given code object (nested code not included)"""
+    return {line for _, line in dis.findlinestarts(code) if line is not None}
+
+
+_no_breakpoints = MappingProxyType({})
+
+_debugger_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def _is_debugger_file(filename):
+    """whether the file comes from this directory (so we do not debug the debugger!)"""
+    return os.path.dirname(filename) == _debugger_dir
+
+
+class Debugger:
+    def __init__(self, frontend, backend="auto"):
+        self.frontend = frontend
+        self.backend_name = backend  # "auto", "monitoring" or "settrace"
+        self.backend = create_backend(self, backend)
+        self.enabled = False  # whether the debugger window wants us to trace
+        self.stepping = False  # stop at the next line of any traced code
+        # step over / out: ('over', frame) stops at the next line of the frame,
+        # ('out', frame) - when the frame returns, stepping continues in the caller
+        self.next_step = None
+        self.temp_breakpoint = None  # run to cursor
+        self.current_frame = None
+        self.stopped = False
+        self.stop_time = None  # perf_counter() when the current stop was hit
+        self.main_thread_id = threading.get_ident()  # the thread of the GUI
+        self.traced_threads = {self.main_thread_id}  # threads where we may stop
+        self.step_thread = None  # thread of the last stop - stepping applies to it
+        self.stop_lock = threading.RLock()  # one stopped thread at a time
+        self.resume_event = threading.Event()  # releases a stopped worker thread
+        self.paths = PathCache()  # canonical paths of traced files
+        self.breakpoints = BreakpointRegistry()
+        self.log = LogBuffer()  # messages of logpoints
+        # breakpoint index: code object -> breakpoints in lines of the code object.
+        # Reloaded modules get new code objects, so they are looked up again.
+        # A plain dict - it is looked up on every call. It keeps the code objects
+        # alive, so it is cleared when the debugger is disabled or gets too big.
+        self.bp_codes = {}
+
+    def set_enabled(self, enabled):
+        """called when the debugger window is opened or closed"""
+        self.enabled = enabled
+        if not enabled:
+            self.bp_codes.clear()  # code run while tracing is not kept alive
+        if enabled:
+            self.paths.invalidate()  # symlinks may have changed since last time
+            # pick the backend again - another debugger may have started/stopped meanwhile
+            self.backend.release()
+            self.backend = create_backend(self, self.backend_name)
+        self.update_tracing()
+
+    def update_tracing(self):
+        """Attach the backend only if there is a chance we will stop somewhere:
+        with no breakpoints and no pending step the tracing is fully detached."""
+        needed = self.enabled and (
+            self.stepping or self.next_step is not None or self.has_breakpoints()
+        )
+        try:
+            self.backend.install(needed)
+        except ValueError:
+            # sys.monitoring tool id has been taken by another tool
+            self.backend = SetTraceBackend(self)
+            self.backend.install(needed)
+
+    def supports_threads(self):
+        """whether worker threads can be traced with the current backend"""
+        return self.backend.supports_threads
+
+    def set_thread_traced(self, thread_id, traced):
+        """opt-in (or out) tracing of a worker thread - other threads pay nothing"""
+        if thread_id == self.main_thread_id:
+            return
+        if traced:
+            self.traced_threads.add(thread_id)
+        else:
+            self.traced_threads.discard(thread_id)
+        self.update_tracing()
+
+    def invalidate_breakpoints(self):
+        """to be called whenever breakpoints are changed or files are (re)loaded"""
+        self.bp_codes.clear()
+        self.backend.reset()
+        self.update_tracing()
+
+    def has_breakpoints(self):
+        return self.temp_breakpoint is not None or self.breakpoints.has_breakpoints()
+
+    def breakpoint_lines(self, code):
+        """breakpoints in the lines of the code object: line number -> Breakpoint (cached)"""
+        try:
+            return self.bp_codes[code]
+        except KeyError:
+            pass
+
+        filename = self.paths.canonical(code.co_filename)
+        file_bps = self.breakpoints.files.get(filename)
+        temp_bp = self.temp_breakpoint
+        if temp_bp is not None and temp_bp.filename == filename:
+            file_bps = {temp_bp.line_no: temp_bp, **(file_bps or {})}
+        if not file_bps:
+            result = _no_breakpoints
+        else:
+            lines = code_lines(code)
+            result = {
+                line_no: bp for line_no, bp in file_bps.items() if line_no in lines
+            }
+        if len(self.bp_codes) >= MAX_BP_CODES:
+            self.bp_codes.clear()  # e.g. code generated on the fly
+        self.bp_codes[code] = result
+        return result
+
+    def code_has_breakpoint(self, code):
+        return bool(self.breakpoint_lines(code))
+
+    def is_traceable(self, code):
+        """whether we may stop in the code when stepping (we do not debug the debugger!)"""
+        filename = self.paths.canonical(code.co_filename)
+        return filename in self.breakpoints.files or not _is_debugger_file(filename)
+
+    def line_event(self, frame):
+        """called by the tracing backend for line events of the traced code"""
+        # print "++ line", format_frame(frame)
+        bp = self.breakpoint_lines(frame.f_code).get(frame.f_lineno)
+        if bp is not None:
+            if not bp.should_stop(frame):
+                bp = None  # condition not satisfied or hit is ignored
+            elif bp.log_code is not None:
+                # logpoint: just leave a message and carry on
+                self.log.append(bp.filename, bp.line_no, bp.format_log_message(frame))
+                bp = None
+        if bp is None:
+            if not self.stepping:
+                next_step = self.next_step
+                if (
+                    next_step is None
+                    or next_step[0] != "over"
+                    or next_step[1] is not frame
+                ):
+                    return
+            elif threading.get_ident() != self.step_thread:
+                return  # stepping into is limited to the thread that stopped
+
+        self.stop(frame, self.paths.canonical(frame.f_code.co_filename))
+
+    def return_event(self, frame):
+        """called by the tracing backend when a traced frame returns (or yields)"""
+        next_step = self.next_step
+        if next_step is not None and next_step[1] is frame:
+            # the frame of step over / out is finished: stop at the next line anywhere
+            self.next_step = None
+            self.stepping = True
+            self.update_tracing()
+
+    def stop(self, frame, filename):
+        """let the front end show the stopped frame until the user continues"""
+        thread_id = threading.get_ident()
+        in_main_thread = thread_id == self.main_thread_id
+        # worker threads wait for their turn, but the GUI thread must never block:
+        # it does not stop while a worker is stopped
+        if not self.stop_lock.acquire(blocking=not in_main_thread):
+            return
+        try:
+            if not self.enabled:
+                return  # the window has been closed while waiting for the turn
+            self.stop_time = time.perf_counter()
+            self.stopped = True
+            self.current_frame = frame
+            self.step_thread = thread_id
+            if self.temp_breakpoint is not None:
+                self.temp_breakpoint = (
+                    None  # we have either got there or stopped earlier
+                )
+                self.invalidate_breakpoints()
+            self.backend.stopped(frame)
+            if in_main_thread:
+                self.frontend.debugger_stopped(frame, filename)  # blocks until resumed
+            else:
+                self.resume_event.clear()
+                self.frontend.debugger_stopped_in_thread(frame, filename)
+                self.resume_event.wait()
+        finally:
+            self.stop_lock.release()
+
+    def step_into(self):
+        self.stepping = True
+        self.next_step = None
+        self.resume_execution()
+
+    def step_over(self):
+        # callees of the frame are not traced (unless they have breakpoints)
+        self.stepping = False
+        self.next_step = ("over", self.current_frame)
+        self.resume_execution()
+
+    def step_out(self):
+        self.stepping = False
+        self.next_step = ("out", self.current_frame)
+        self.resume_execution()
+
+    def run_to(self, filename, line_no):
+        # run to cursor is just a temporary breakpoint
+        self.stepping = False
+        self.next_step = None
+        self.temp_breakpoint = Breakpoint(filename, line_no)
+        self.bp_codes.clear()
+        self.backend.reset()
+        self.resume_execution()
+
+    def resume(self):
+        self.stepping = False
+        self.next_step = None  # breakpoints must not be filtered by the last step
+        self.resume_execution()
+
+    def resume_execution(self):
+        self.current_frame = None
+        self.stopped = False
+        self.update_tracing()
+        self.frontend.debugger_resumed()
+        self.resume_event.set()  # in case a worker thread is stopped
@@ -16,291 +16,323 @@
 
 import os
 import sys
-import traceback
+import time
 
-from qgis.PyQt.QtCore import QEventLoop, QSize, Qt, QRect, QSettings
+from qgis.PyQt.Qsci import QsciScintilla
+from qgis.PyQt.QtCore import QEventLoop, Qt, QSettings, pyqtSignal
 from qgis.PyQt.QtWidgets import (
-    QWidget,
-    QPlainTextEdit,
-    QTextEdit,
     QMainWindow,
     QTabWidget,
     QDockWidget,
     QFileDialog,
     QApplication,
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QSpinBox,
 )
-from qgis.PyQt.QtGui import (
-    QFontDatabase,
-    QPainter,
-    QTextCursor,
-    QTextFormat,
-    QColor,
-    QIcon,
-)
+from qgis.PyQt.QtGui import QColor, QIcon
 
 from .variablesview import VariablesView
+from .variablessearch import VariablesSearchWidget
 from .framesview import FramesView
-from .highlighter import PythonHighlighter
-
-
-def format_frame(frame):
-    return "<FRAME %s:%d :: %s>" % (
-        frame.f_code.co_filename,
-        frame.f_lineno,
-        frame.f_code.co_name,
-    )
-
-
-def format_frames(frame):
-    if frame.f_back is not None:
-        ret = format_frames(frame.f_back) + "\n"
-    else:
-        ret = ""
-    ret += format_frame(frame)
-    return ret
-
+from .breakpoints import Breakpoint, compile_condition, compile_log_message
+from .debugger import Debugger
+from .logpointsview import LogpointsView
+from .sourceloader import SourceLoader, is_large_file, read_source
+from .sourceview import SourceView
+from .threadsview import ThreadsView
+
+
+class SourceWidget(SourceView):
+    """Source code of a debugged file. Breakpoints and the current line are native
+    Scintilla markers, only the markers of the line that changes are touched."""
+
+    # a breakpoint has been added or removed by clicking the margin
+    breakpointToggled = pyqtSignal(int)
+
+    MARGIN_LINE_NUMBERS = 0  # margins of QgsCodeEditor
+    MARGIN_MARKERS = 1
+    # marker numbers - the lower ones are used by QgsCodeEditor itself
+    MARKER_DEBUG_ARROW = 8
+    MARKER_DEBUG_LINE = 9
+    # kind of breakpoint -> (marker in the margin, background of the line)
+    BREAKPOINT_MARKERS = {
+        "breakpoint": (10, 11),
+        "conditional": (12, 13),
+        "logpoint": (14, 15),
+    }
+
+    def __init__(self, filename, parent=None, breakpoints=None):
+        SourceView.__init__(self, parent)
 
-def frame_depth(frame):
-    depth = 0
-    while frame is not None:
-        depth += 1
-        frame = frame.f_back
-    return depth
-
-
-def _is_deeper_frame(f0_filename, f0_lineno, f1):
-    """whether f1 has been called from f0_filename:f0_lineno (directly or indirectly)"""
-    while f1 is not None:
-        if f1.f_code.co_filename == f0_filename and f1.f_lineno == f0_lineno:
-            return True
-        f1 = f1.f_back
-    return False
-
-
-class Debugger:
-    def __init__(self, main_widget):
-        self.ev_loop = QEventLoop()
-        self.main_widget = main_widget
-        self.stepping = False
-        self.next_step = (
-            None  # None = stop always, ('over', file, line), ('at', file, line)
+        self.filename = filename
+        # line number (1-based) -> Breakpoint, shared with the BreakpointRegistry
+        self.breakpoints = breakpoints if breakpoints is not None else {}
+        self.debug_line = -1
+        self.loader = None  # SourceLoader while a large file is being loaded
+
+        self.marker_handles = {}  # line number -> handles of breakpoint markers
+        self.debug_handles = ()  # handles of the current line markers
+        self.define_markers()
+        self.setMarginSensitivity(self.MARGIN_MARKERS, True)
+        self.marginClicked.connect(self.on_margin_clicked)
+
+        # hit counts of breakpoints are in an extra text margin
+        self.margin_hits = self.margins()
+        self.setMargins(self.margin_hits + 1)
+        self.setMarginType(
+            self.margin_hits, QsciScintilla.MarginType.TextMarginRightJustified
         )
-        self.current_frame = None
-        self.stopped = False
-
-    def trace_function(self, frame, event, arg):
-        """to be used for sys.trace"""
-        if event == "call":  # arg is always None
-            filename = os.path.normpath(os.path.realpath(frame.f_code.co_filename))
-
-            # we need to return tracing function for this frame - either None or this function...
-
-            if filename not in self.main_widget.text_edits:
-                # ignore files from this directory (so we do not debug the debugger!)
-                if os.path.dirname(filename) == os.path.dirname(
-                    os.path.realpath(__file__)
-                ):
-                    return None  # do not trace this file
-            return self.trace_function
-
-        elif event == "line":  # arg is always None
-            # print "++ line", format_frame(frame)
-            filename = os.path.normpath(os.path.realpath(frame.f_code.co_filename))
-
-            if filename in self.main_widget.text_edits:
-                text_edit = self.main_widget.text_edits[filename]
-                breakpoints = text_edit.breakpoints
-            else:
-                text_edit = None
-                breakpoints = []
-
-            if self.stepping or frame.f_lineno - 1 in breakpoints:
-                if isinstance(self.next_step, tuple):
-                    if self.next_step[0] == "over":
-                        prev_filename = self.next_step[1]
-                        prev_lineno = self.next_step[2]
-                        if _is_deeper_frame(prev_filename, prev_lineno, frame):
-                            return  # in a function deeper inside or the same line
-                    elif self.next_step[0] == "at":
-                        if (
-                            filename != self.next_step[1]
-                            or frame.f_lineno != self.next_step[2]
-                        ):
-                            return  # only stop at the particular line of code
-                    elif self.next_step[0] == "out":
-                        if frame_depth(frame) >= self.next_step[1]:
-                            return  # only stop when in lower frame
-                self.stopped = True
-                self.current_frame = frame
-                self.main_widget.vars_view.setVariables(frame.f_locals)
-                self.main_widget.frames_view.setTraceback(
-                    traceback.extract_stack(frame)
-                )
-                if text_edit is None:  # ensure it is loaded
-                    self.main_widget.load_file(filename)
-                    text_edit = self.main_widget.text_edits[filename]
-                self.main_widget.tab_widget.setCurrentWidget(text_edit)
-                text_edit.debug_line = frame.f_lineno
-                text_edit.update_highlight()
-                self.main_widget.update_buttons()
-                self.main_widget.raise_()
-                self.main_widget.activateWindow()
-                self.ev_loop.exec()  # this will halt execution here for some time
-                self.stopped = False
-                self.main_widget.update_buttons()
-
-        elif event == "return":  # arg is return value
-            pass
-            # print "++ return", arg
-
-        else:
-            pass
-            # print "trace", format_frames(frame), " | ", event, arg
-
-
-class LineNumberArea(QWidget):
-    def __init__(self, editor):
-        QWidget.__init__(self, editor)
-        self.editor = editor
-
-    def sizeHint(self):
-        return QSize(self.editor.lineNumberAreaWidth(), 0)
-
-    def paintEvent(self, event):
-        self.editor.lineNumberAreaPaintEvent(event)
-
-
-class SourceWidget(QPlainTextEdit):
-    def __init__(self, filename, parent=None):
-        super().__init__(parent)
-
-        with open(filename, encoding="utf-8") as f:
-            file_content = f.read()
-        self.setPlainText(file_content)
-
-        # this should use the default monospaced font as set in the system
-        font = QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
-        self.setFont(font)
-
-        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
-
-        self.setReadOnly(True)
-        self.setTextInteractionFlags(
-            self.textInteractionFlags()
-            | Qt.TextInteractionFlag.TextSelectableByKeyboard
+        self.setMarginWidth(self.margin_hits, 0)
+        # texts in the margins are only set when they change
+        self.hit_texts = {}  # line number -> text shown in the hits margin
+        self.hits_digits = 0  # hits margin is wide enough for this many digits
+        self.line_number_digits = 0
+
+        self.load_source()
+        self.update_line_number_width()
+
+    def define_markers(self):
+        def _define(marker, symbol, color):
+            self.markerDefine(symbol, marker)
+            self.setMarkerBackgroundColor(color, marker)
+            self.setMarkerForegroundColor(color.darker(150), marker)
+            return 1 << marker
+
+        symbols_mask = _define(
+            self.MARKER_DEBUG_ARROW,
+            QsciScintilla.MarkerSymbol.RightArrow,
+            QColor(0, 160, 160),
+        )
+        lines_mask = _define(
+            self.MARKER_DEBUG_LINE,
+            QsciScintilla.MarkerSymbol.Background,
+            QColor(180, 255, 255),
         )
+        for kind, symbol_color, line_color in (
+            ("breakpoint", QColor(220, 0, 0), QColor(255, 180, 180)),
+            ("conditional", QColor(230, 130, 0), QColor(255, 210, 150)),
+            ("logpoint", QColor(40, 100, 220), QColor(200, 220, 255)),
+        ):
+            symbol_marker, line_marker = self.BREAKPOINT_MARKERS[kind]
+            symbols_mask |= _define(
+                symbol_marker, QsciScintilla.MarkerSymbol.Circle, symbol_color
+            )
+            lines_mask |= _define(
+                line_marker, QsciScintilla.MarkerSymbol.Background, line_color
+            )
 
-        self.highlighter = PythonHighlighter(self.document())
+        # line backgrounds must not be drawn in any margin
+        for margin in range(self.margins()):
+            self.setMarginMarkerMask(
+                margin, self.marginMarkerMask(margin) & ~lines_mask
+            )
+        self.setMarginMarkerMask(
+            self.MARGIN_MARKERS,
+            self.marginMarkerMask(self.MARGIN_MARKERS) | symbols_mask,
+        )
 
-        # line numbers support
-        self.lineNumberArea = LineNumberArea(self)
-        self.blockCountChanged.connect(self.updateLineNumberAreaWidth)
-        self.updateRequest.connect(self.updateLineNumberArea)
-        self.updateLineNumberAreaWidth(0)
+    def load_source(self):
+        """Small files are read right away. Large files are memory-mapped and read
+        in a worker thread, the content is appended as it comes.
+        Raises OSError if the file cannot be read."""
+        if not is_large_file(self.filename):
+            self.setText(read_source(self.filename))
+            return
 
-        self.filename = filename
-        self.breakpoints = []
-        self.debug_line = -1
+        self.setAnnotationDisplay(QsciScintilla.AnnotationDisplay.AnnotationBoxed)
+        self.annotate(0, "Loading…", QsciScintilla.STYLE_DEFAULT)
+        self.loader = SourceLoader(self.filename, self)
+        self.loader.chunkLoaded.connect(self.append_source)
+        self.loader.loadingFailed.connect(self.on_loading_failed)
+        self.loader.finished.connect(self.on_loading_finished)
+        self.loader.start()
+
+    def stop_loading(self):
+        if self.loader is not None:
+            self.loader.requestInterruption()
+            self.loader.wait()
+            self.loader = None
+
+    def append_source(self, text):
+        first_new_line = self.lines()
+        self.append(text)  # unlike setText() this does not scroll
+        last_line = self.lines()
+        self.update_line_number_width()
+
+        # markers of lines that were not there yet
+        for line_no in self.breakpoints:
+            if first_new_line <= line_no <= last_line:
+                self.update_breakpoint_marker(line_no)
+        if first_new_line <= self.debug_line <= last_line:
+            self.set_debug_line(self.debug_line)
+
+    def on_loading_failed(self, message):
+        self.annotate(
+            0, "Failed to load: {}".format(message), QsciScintilla.STYLE_DEFAULT
+        )
 
-    # support for line numbers - start
+    def on_loading_finished(self):
+        if self.loader is not None and not self.loader.isInterruptionRequested():
+            self.clearAnnotations(0)
+        self.loader = None
 
-    def lineNumberAreaWidth(self):
-        digits = 1
-        max_digit = max(1, self.blockCount())
-        while max_digit >= 10:
-            max_digit /= 10
-            digits += 1
-        return self.fontMetrics().horizontalAdvance("9") * (digits + 2)
+    def cursor_line(self):
+        """1-based line number of the cursor"""
+        return self.getCursorPosition()[0] + 1
 
-    def updateLineNumberAreaWidth(self, newBlockCount):
-        self.setViewportMargins(self.lineNumberAreaWidth(), 0, 0, 0)
+    def on_margin_clicked(self, margin, line, modifiers):
+        if margin != self.MARGIN_MARKERS:
+            return  # e.g. folding margin
+        self.toggle_breakpoint(line + 1)
+        self.breakpointToggled.emit(line + 1)
 
-    def updateLineNumberArea(self, rect, dy):
-        if dy:
-            self.lineNumberArea.scroll(0, dy)
+    def toggle_breakpoint(self, line_no=None):
+        if line_no is None:
+            line_no = self.cursor_line()
+        if line_no in self.breakpoints:
+            del self.breakpoints[line_no]
         else:
-            self.lineNumberArea.update(
-                0, rect.y(), self.lineNumberArea.width(), rect.height()
-            )
+            self.breakpoints[line_no] = Breakpoint(self.filename, line_no)
+        self.update_breakpoint_marker(line_no)
+        self.update_hit_counts()
+
+    def update_breakpoint_marker(self, line_no):
+        """add, change or remove markers of the breakpoint at the line"""
+        for handle in self.marker_handles.pop(line_no, ()):
+            self.markerDeleteHandle(handle)
+
+        bp = self.breakpoints.get(line_no)
+        if bp is None or line_no > self.lines():
+            return  # the line may not be loaded yet - see append_source()
+        if bp.is_logpoint():
+            kind = "logpoint"
+        elif bp.is_conditional():
+            kind = "conditional"
+        else:
+            kind = "breakpoint"
+        self.marker_handles[line_no] = tuple(
+            self.markerAdd(line_no - 1, marker)
+            for marker in self.BREAKPOINT_MARKERS[kind]
+        )
 
-        if rect.contains(self.viewport().rect()):
-            self.updateLineNumberAreaWidth(0)
+    def set_debug_line(self, line_no):
+        """move the current line markers (-1 to remove them) and scroll there"""
+        for handle in self.debug_handles:
+            self.markerDeleteHandle(handle)
+        self.debug_handles = ()
+        self.debug_line = line_no
+        if line_no == -1 or line_no > self.lines():
+            return
 
-    def resizeEvent(self, e):
-        QPlainTextEdit.resizeEvent(self, e)
-        cr = self.contentsRect()
-        self.lineNumberArea.setGeometry(
-            QRect(cr.left(), cr.top(), self.lineNumberAreaWidth(), cr.height())
+        self.debug_handles = (
+            self.markerAdd(line_no - 1, self.MARKER_DEBUG_ARROW),
+            self.markerAdd(line_no - 1, self.MARKER_DEBUG_LINE),
         )
-
-    def lineNumberAreaPaintEvent(self, event):
-        painter = QPainter(self.lineNumberArea)
-        painter.fillRect(event.rect(), Qt.GlobalColor.white)
-        painter.fillRect(
-            QRect(
-                event.rect().right() - 1, event.rect().top(), 1, event.rect().height()
-            ),
-            Qt.GlobalColor.lightGray,
+        self.setCursorPosition(line_no - 1, 0)
+        self.ensureLineVisible(line_no - 1)
+
+    def update_line_number_width(self):
+        """fit the line number margin to the number of lines - the width is only
+        measured again when the number of digits changes"""
+        digits = max(len(str(self.lines())), 4)
+        if digits != self.line_number_digits:
+            self.line_number_digits = digits
+            self.setMarginWidth(self.MARGIN_LINE_NUMBERS, "9" * (digits + 1))
+
+    def update_hit_counts(self):
+        """show how many times the breakpoints have been hit - only lines
+        where the count has changed are updated"""
+        texts = {
+            line_no: str(bp.hits)
+            for line_no, bp in self.breakpoints.items()
+            if bp.hits and line_no <= self.lines()
+        }
+        for line_no in self.hit_texts.keys() - texts.keys():
+            self.clearMarginText(line_no - 1)
+        for line_no, text in texts.items():
+            if self.hit_texts.get(line_no) != text:
+                self.setMarginText(line_no - 1, text, QsciScintilla.STYLE_LINENUMBER)
+        self.hit_texts = texts
+
+        digits = max(map(len, texts.values()), default=0)
+        if digits != self.hits_digits:
+            self.hits_digits = digits
+            self.setMarginWidth(self.margin_hits, "9" * (digits + 1) if digits else 0)
+
+
+class BreakpointDialog(QDialog):
+    """Allows setting condition, hit counters and log message of a breakpoint"""
+
+    def __init__(self, bp, parent=None):
+        QDialog.__init__(self, parent)
+        self.bp = bp
+
+        self.setWindowTitle(
+            "Breakpoint - {}:{}".format(os.path.basename(bp.filename), bp.line_no)
         )
-        block = self.firstVisibleBlock()
-        blockNumber = block.blockNumber()
-        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
-        bottom = top + self.blockBoundingRect(block).height()
-
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and bottom >= event.rect().top():
-                painter.setPen(Qt.GlobalColor.black)
-                painter.drawText(
-                    0,
-                    int(top),
-                    self.lineNumberArea.width()
-                    - self.fontMetrics().horizontalAdvance("9"),
-                    self.fontMetrics().height(),
-                    Qt.AlignmentFlag.AlignRight,
-                    str(blockNumber + 1),
-                )
-            block = block.next()
-            top = bottom
-            bottom = top + self.blockBoundingRect(block).height()
-            blockNumber += 1
-
-    # support for line numbers - finish
-
-    def toggle_breakpoint(self):
-        line_no = self.textCursor().blockNumber()
-        if line_no in self.breakpoints:
-            self.breakpoints.remove(line_no)
-        else:
-            self.breakpoints.append(line_no)
-        self.update_highlight()
-
-    def update_highlight(self):
-        def _highlight(line_no, color):
-            block = self.document().findBlockByLineNumber(line_no)
-            highlight = QTextEdit.ExtraSelection()
-            highlight.cursor = QTextCursor(block)
-            highlight.format.setProperty(QTextFormat.Property.FullWidthSelection, True)
-            highlight.format.setBackground(color)
-            return highlight
-
-        sel = []
 
-        # breakpoints
-        for bp_line_no in self.breakpoints:
-            sel.append(_highlight(bp_line_no, QColor(255, 180, 180)))
-
-        # debug line
-        if self.debug_line != -1:
-            sel.append(_highlight(self.debug_line - 1, QColor(180, 255, 255)))
-            # also scroll to the line
-            block = self.document().findBlockByLineNumber(self.debug_line - 1)
-            self.setTextCursor(QTextCursor(block))
-            self.ensureCursorVisible()
+        self.edit_condition = QLineEdit(bp.condition or "")
+        self.edit_condition.setPlaceholderText("e.g. feature.id() == 42")
+        self.spin_ignore = QSpinBox()
+        self.spin_ignore.setRange(0, 2**31 - 1)
+        self.spin_ignore.setValue(bp.ignore_count)
+        self.spin_every_nth = QSpinBox()
+        self.spin_every_nth.setRange(1, 2**31 - 1)
+        self.spin_every_nth.setValue(bp.every_nth)
+        self.edit_log_message = QLineEdit(bp.log_message or "")
+        self.edit_log_message.setPlaceholderText("e.g. i = {i}, total = {total:.2f}")
+        self.edit_log_message.setToolTip(
+            "If set, the message is logged instead of stopping (logpoint)"
+        )
 
-        self.setExtraSelections(sel)
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QFormLayout()
+        layout.addRow("Condition", self.edit_condition)
+        layout.addRow("Ignore first hits", self.spin_ignore)
+        layout.addRow("Then stop every Nth hit", self.spin_every_nth)
+        layout.addRow("Log message", self.edit_log_message)
+        layout.addRow(QLabel("Hits so far: {}".format(bp.hits)))
+        layout.addRow(buttons)
+        self.setLayout(layout)
+
+    def accept(self):
+        # both are checked first, the breakpoint is changed only if they are valid
+        condition = self.edit_condition.text().strip()
+        log_message = self.edit_log_message.text()
+        try:
+            if condition:
+                compile_condition(condition)
+        except SyntaxError as e:
+            QMessageBox.critical(self, "Invalid condition", str(e))
+            return
+        try:
+            if log_message:
+                compile_log_message(log_message)
+        except SyntaxError as e:
+            QMessageBox.critical(self, "Invalid log message", str(e))
+            return
+        self.bp.set_condition(condition)
+        self.bp.set_log_message(log_message)
+        self.bp.ignore_count = self.spin_ignore.value()
+        self.bp.every_nth = self.spin_every_nth.value()
+        self.bp.hits = 0  # counting starts again with the new settings
+        QDialog.accept(self)
 
 
 class DebuggerWidget(QMainWindow):
+    # a worker thread has stopped: (frame, filename) - delivered in the GUI thread
+    stoppedInThread = pyqtSignal(object, str)
+
     def __init__(self, parent=None):
         QMainWindow.__init__(self, parent)
 
@@ -332,6 +364,13 @@ class DebuggerWidget(QMainWindow):
             _icon("record"), "Toggle breakpoint (F9)", self.on_toggle_breakpoint
         )
         self.action_bp.setShortcut("F9")
+        self.action_bp_edit = self.toolbar.addAction(
+            "Breakpoint condition…", self.on_edit_breakpoint
+        )
+        self.action_bp_edit.setToolTip(
+            "Edit breakpoint condition, hits and log message (Ctrl+F9)"
+        )
+        self.action_bp_edit.setShortcut("Ctrl+F9")
         self.toolbar.addSeparator()
         self.action_continue = self.toolbar.addAction(
             _icon("play"), "Continue (F5)", self.on_continue
@@ -366,16 +405,46 @@ class DebuggerWidget(QMainWindow):
 
         self.dock_vars = QDockWidget("Variables", self)
         self.dock_vars.setObjectName("DockVariables")
-        self.dock_vars.setWidget(self.vars_view)
+        self.dock_vars.setWidget(VariablesSearchWidget(self.vars_view))
         self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.dock_vars)
 
         self.resize(800, 800)
 
-        self.debugger = Debugger(self)
+        self.ev_loop = QEventLoop()
+        settings = QSettings()
+
+        # tracing backend: "auto" (sys.monitoring where available), "monitoring" or "settrace"
+        self.debugger = Debugger(
+            self, settings.value("/plugins/firstaid/debugger-backend", "auto")
+        )
+        self.debugger.log.set_capacity(
+            int(settings.value("/plugins/firstaid/logpoint-buffer-size", 10000))
+        )
+
+        self.logpoints_view = LogpointsView(self.debugger.log)
+        self.dock_logpoints = QDockWidget("Logpoints", self)
+        self.dock_logpoints.setObjectName("DockLogpoints")
+        self.dock_logpoints.setWidget(self.logpoints_view)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.dock_logpoints)
+
+        self.threads_view = ThreadsView(self.debugger)
+        self.dock_threads = QDockWidget("Threads", self)
+        self.dock_threads.setObjectName("DockThreads")
+        self.dock_threads.setWidget(self.threads_view)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.dock_threads)
+
+        self.label_stop_time = QLabel()
+        self.label_stop_time.setToolTip(
+            "Time from reaching the line to showing it (last stop)"
+        )
+        self.statusBar().addPermanentWidget(self.label_stop_time)
+
+        self.stoppedInThread.connect(
+            self.show_stopped_frame, Qt.ConnectionType.QueuedConnection
+        )
 
         self.update_buttons()
 
-        settings = QSettings()
         self.restoreGeometry(settings.value("/plugins/firstaid/debugger-geometry", b""))
         self.restoreState(settings.value("/plugins/firstaid/debugger-windowstate", b""))
 
@@ -395,11 +464,14 @@ class DebuggerWidget(QMainWindow):
 
     def start_tracing(self):
         """called from constructor or when the debugger window is opened again"""
-        sys.settrace(self.debugger.trace_function)
+        self.debugger.set_enabled(True)
 
     def closeEvent(self, event):
-        # disable tracing
-        sys.settrace(None)
+        # disable tracing and let go of the code stopped at a breakpoint
+        # (a worker thread would wait for resume forever otherwise)
+        self.debugger.set_enabled(False)
+        if self.debugger.stopped:
+            self.debugger.resume()
 
         settings = QSettings()
         settings.setValue("/plugins/firstaid/debugger-geometry", self.saveGeometry())
@@ -410,23 +482,64 @@ class DebuggerWidget(QMainWindow):
 
         QMainWindow.closeEvent(self, event)
 
+    def debugger_stopped(self, frame, filename):
+        """show the stopped frame and run nested event loop until the user continues"""
+        self.show_stopped_frame(frame, filename)
+        self.ev_loop.exec()  # this will halt execution here for some time
+
+    def debugger_stopped_in_thread(self, frame, filename):
+        """called from a stopped worker thread - it waits for resume on its own,
+        we just need to show its frame from the GUI thread"""
+        self.stoppedInThread.emit(frame, filename)
+
+    def show_stopped_frame(self, frame, filename):
+        self.vars_view.setFrame(frame)
+        self.frames_view.setTraceback(frame)
+        if filename not in self.text_edits:  # ensure it is loaded
+            self.load_file(filename)
+        text_edit = self.text_edits[filename]
+        self.tab_widget.setCurrentWidget(text_edit)
+        text_edit.set_debug_line(frame.f_lineno)
+        text_edit.update_hit_counts()
+        self.update_buttons()
+        if self.threads_view.isVisible():
+            self.threads_view.refresh()
+        self.raise_()
+        self.activateWindow()
+        # time-to-interactive: from hitting the line to the window being ready
+        self.label_stop_time.setText(
+            "Stopped in {:.1f} ms".format(
+                (time.perf_counter() - self.debugger.stop_time) * 1000
+            )
+        )
+
+    def debugger_resumed(self):
+        self.update_buttons()
+        self.ev_loop.exit(0)
+
     def load_file(self, filename):
-        filename = os.path.normpath(os.path.realpath(filename))
+        filename = self.debugger.paths.canonical(filename)
 
         if filename in self.text_edits:
             self.switch_to_file(filename)
             return  # already there...
         try:
-            self.text_edits[filename] = SourceWidget(filename)
+            self.text_edits[filename] = SourceWidget(
+                filename,
+                breakpoints=self.debugger.breakpoints.file_breakpoints(filename),
+            )
         except OSError:
             # TODO: display warning we failed to read the file
+            self.debugger.breakpoints.remove_file(filename)
             return
         tab_text = os.path.basename(filename)
         self.tab_widget.addTab(self.text_edits[filename], tab_text)
         self.tab_widget.setTabToolTip(self.tab_widget.count() - 1, filename)
         self.tab_widget.setCurrentWidget(self.text_edits[filename])
         self.text_edits[filename].cursorPositionChanged.connect(self.on_pos_changed)
+        self.text_edits[filename].breakpointToggled.connect(self.on_breakpoint_toggled)
         self.on_pos_changed()
+        self.debugger.invalidate_breakpoints()
 
     def switch_to_file(self, filename):
         if filename in self.text_edits:
@@ -435,8 +548,11 @@ class DebuggerWidget(QMainWindow):
     def unload_file(self, filename):
         for index in range(self.tab_widget.count()):
             if self.text_edits[filename] == self.tab_widget.widget(index):
+                self.text_edits[filename].stop_loading()
                 self.tab_widget.removeTab(index)
                 del self.text_edits[filename]
+                self.debugger.breakpoints.remove_file(filename)
+                self.debugger.invalidate_breakpoints()
                 break
 
     def get_file_name(self, args):
@@ -457,6 +573,7 @@ class DebuggerWidget(QMainWindow):
             return
 
         settings.setValue("firstaid/lastFolder", os.path.dirname(filename))
+        self.debugger.paths.invalidate()  # user may have changed things on disk
         self.load_file(filename)
 
     def on_tab_close_requested(self, index):
@@ -466,9 +583,9 @@ class DebuggerWidget(QMainWindow):
         if not self.current_text_edit():
             self.statusBar().showMessage("[no file]")
             return
-        c = self.current_text_edit().textCursor()
-        line = c.blockNumber() + 1
-        col = c.positionInBlock() + 1
+        line, col = self.current_text_edit().getCursorPosition()
+        line += 1
+        col += 1
         self.statusBar().showMessage("%d:%d" % (line, col))
 
     def on_run(self):
@@ -490,6 +607,29 @@ class DebuggerWidget(QMainWindow):
     def on_toggle_breakpoint(self):
         if self.current_text_edit():
             self.current_text_edit().toggle_breakpoint()
+            self.debugger.invalidate_breakpoints()
+
+    def on_breakpoint_toggled(self, line_no):
+        self.debugger.invalidate_breakpoints()
+
+    def on_edit_breakpoint(self):
+        text_edit = self.current_text_edit()
+        if not text_edit:
+            return
+        line_no = text_edit.cursor_line()
+        bp = text_edit.breakpoints.get(line_no)
+        if bp is None:
+            bp = Breakpoint(text_edit.filename, line_no)
+
+        dlg = BreakpointDialog(bp, self)
+        if not dlg.exec():
+            return
+
+        if line_no not in text_edit.breakpoints:
+            text_edit.breakpoints[line_no] = bp
+            self.debugger.invalidate_breakpoints()
+        text_edit.update_breakpoint_marker(line_no)
+        text_edit.update_hit_counts()
 
     def update_buttons(self):
         active = self.debugger.stopped
@@ -498,40 +638,29 @@ class DebuggerWidget(QMainWindow):
         self.action_step_out.setEnabled(active)
         self.action_run_to_cursor.setEnabled(active)
         self.action_continue.setEnabled(active)
+        self.statusBar().setToolTip(self.debugger.paths.stats_text())
 
     def on_step_into(self):
-        self.debugger.stepping = True
-        self.debugger.next_step = None
-        self.debugger.ev_loop.exit(0)
+        self.debugger.step_into()
 
     def on_step_over(self):
-        self.debugger.stepping = True
-        self.debugger.next_step = (
-            "over",
-            self.debugger.current_frame.f_code.co_filename,
-            self.debugger.current_frame.f_lineno,
-        )
-        self.debugger.ev_loop.exit(0)
+        self.debugger.step_over()
 
     def on_step_out(self):
-        self.debugger.stepping = True
-        self.debugger.next_step = ("out", frame_depth(self.debugger.current_frame))
-        self.debugger.ev_loop.exit(0)
+        self.debugger.step_out()
 
     def on_run_to_cursor(self):
-        self.debugger.stepping = True
-        filename = self.tab_widget.currentWidget().filename
-        line_no = self.tab_widget.currentWidget().textCursor().blockNumber() + 1
-        self.debugger.next_step = ("at", filename, line_no)
-        self.debugger.ev_loop.exit(0)
+        filename = self.debugger.paths.canonical(
+            self.tab_widget.currentWidget().filename
+        )
+        line_no = self.tab_widget.currentWidget().cursor_line()
+        self.debugger.run_to(filename, line_no)
 
     def on_continue(self):
-        self.debugger.stepping = False
-        self.current_text_edit().debug_line = -1
-        self.current_text_edit().update_highlight()
+        self.current_text_edit().set_debug_line(-1)
         self.vars_view.setVariables({})
         self.frames_view.setTraceback(None)
-        self.debugger.ev_loop.exit(0)
+        self.debugger.resume()
 
 
 if __name__ == "__main__":
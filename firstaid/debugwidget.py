@@ -15,6 +15,7 @@ import traceback
 from traceback import FrameSummary
 import sys
 import json
+import time
 from contextlib import contextmanager
 
 from qgis.PyQt.QtWidgets import (
@@ -28,9 +29,10 @@ from qgis.PyQt.QtWidgets import (
     QDialogButtonBox,
     QPushButton,
     QHBoxLayout,
+    QToolButton,
 )
 from qgis.PyQt.Qsci import QsciScintilla
-from qgis.PyQt.QtCore import pyqtSignal, Qt, QSettings, QCoreApplication
+from qgis.PyQt.QtCore import pyqtSignal, Qt, QSettings, QCoreApplication, QTimer
 from qgis.PyQt.QtGui import QGuiApplication, QIcon, QFontMetrics
 
 from qgis.core import Qgis, QgsApplication
@@ -42,8 +44,10 @@ except ImportError:
     QgsCodeEditorWidget = None
 
 from .variablesview import VariablesView
+from .variablessearch import VariablesSearchWidget
 from .sourceview import SourceView
 from .framesview import FramesView
+from .reprpool import repr_pool
 
 
 def frame_from_traceback(tb, index):
@@ -353,7 +357,7 @@ class DebugWidget(QWidget):
         self.splitterMain = QSplitter(Qt.Orientation.Vertical)
         self.splitterMain.addWidget(self.splitterSrc)
 
-        self.splitterMain.addWidget(self.variables)
+        self.splitterMain.addWidget(VariablesSearchWidget(self.variables))
         self.splitterMain.addWidget(self.console)
         self.splitterMain.setCollapsible(0, False)
         self.splitterMain.setCollapsible(1, False)
@@ -421,14 +425,51 @@ class DebugWidget(QWidget):
 
 
 class DebugDialog(QDialog):
-    def __init__(self, exc_info, parent=None):
+    """Dialog with an exception. With an ExceptionQueue, the user can page through
+    all queued exceptions and see how many times each of them has been raised."""
+
+    def __init__(self, exc_info, parent=None, exception_queue=None):
         QDialog.__init__(self, parent)
 
         self.setObjectName("FirstAidDebugDialog")
         self.setWindowTitle("Python Error")
 
+        self.exception_queue = exception_queue
+        self.entries = []  # queued entries when the page bar was last updated
+        self.current_entry = 0
+
         self.debug_widget = DebugWidget(exc_info)
         layout = QVBoxLayout()
+
+        if exception_queue is not None:
+            self.prev_button = QToolButton()
+            self.prev_button.setArrowType(Qt.ArrowType.LeftArrow)
+            self.prev_button.clicked.connect(
+                lambda: self.show_entry(self.current_entry - 1)
+            )
+            self.next_button = QToolButton()
+            self.next_button.setArrowType(Qt.ArrowType.RightArrow)
+            self.next_button.clicked.connect(
+                lambda: self.show_entry(self.current_entry + 1)
+            )
+            self.page_label = QLabel()
+            self.suppress_button = QPushButton(self.tr("Ignore Further Occurrences"))
+            self.suppress_button.clicked.connect(self.suppress_current)
+
+            page_layout = QHBoxLayout()
+            page_layout.addWidget(self.prev_button)
+            page_layout.addWidget(self.page_label, 1)
+            page_layout.addWidget(self.next_button)
+            page_layout.addWidget(self.suppress_button)
+            layout.addLayout(page_layout)
+
+            # repeated exceptions update the page bar at most a few times per second
+            self.page_timer = QTimer(self)
+            self.page_timer.setSingleShot(True)
+            self.page_timer.setInterval(250)
+            self.page_timer.timeout.connect(self.update_page_bar)
+            self.update_page_bar()
+
         layout.addWidget(self.debug_widget, 1)
 
         self.horz_layout = QHBoxLayout()
@@ -466,6 +507,47 @@ class DebugDialog(QDialog):
 
         QgsGui.enableAutoGeometryRestore(self)
 
+    def queue_changed(self):
+        """more exceptions (or repeats) have been queued"""
+        if not self.page_timer.isActive():
+            self.page_timer.start()
+
+    def update_page_bar(self):
+        self.entries = self.exception_queue.snapshot()
+        if not self.entries:
+            return
+        entry = self.entries[self.current_entry]
+        text = "Exception {} of {}".format(self.current_entry + 1, len(self.entries))
+        if entry.count > 1:
+            text += " - raised {} times, first at {}, last at {}".format(
+                entry.count,
+                time.strftime("%H:%M:%S", time.localtime(entry.first_time)),
+                time.strftime("%H:%M:%S", time.localtime(entry.last_time)),
+            )
+        if self.exception_queue.dropped:
+            text += " ({} more not shown)".format(self.exception_queue.dropped)
+        self.page_label.setText(text)
+        self.prev_button.setEnabled(self.current_entry > 0)
+        self.next_button.setEnabled(self.current_entry < len(self.entries) - 1)
+        self.suppress_button.setEnabled(
+            entry.fingerprint not in self.exception_queue.suppressed
+        )
+
+    def show_entry(self, index):
+        if not 0 <= index < len(self.entries) or index == self.current_entry:
+            return
+        self.debug_widget.save_state()
+        old_widget = self.debug_widget
+        self.debug_widget = DebugWidget(self.entries[index].exc_info)
+        self.layout().replaceWidget(old_widget, self.debug_widget)
+        old_widget.deleteLater()
+        self.current_entry = index
+        self.update_page_bar()
+
+    def suppress_current(self):
+        self.exception_queue.suppress(self.entries[self.current_entry].fingerprint)
+        self.update_page_bar()
+
     def clear_console_history(self):
         self.debug_widget.console.console.history = []
 
@@ -486,17 +568,22 @@ class DebugDialog(QDialog):
             "Trace": [],
         }
         tb: FrameSummary
+        all_values = []  # values of all frames are converted to text at once
         for i, tb in enumerate(self.debug_widget.console.entries):
             local_vars = frame_from_traceback(self.debug_widget.console.tb, i).f_locals
-            local_vars = {k: str(v) for k, v in local_vars.items()}
+            all_values += local_vars.values()
             report["Trace"].append(
                 {
                     "Name": tb.name,
                     "Filename": tb.filename.split("/")[-1],
                     "LineNo": tb.lineno,
-                    "Variables": local_vars,
+                    "Variables": dict.fromkeys(local_vars),
                 }
             )
+        texts = iter(repr_pool.evaluate_all(all_values, str))
+        for frame_report in report["Trace"]:
+            for name in frame_report["Variables"]:
+                frame_report["Variables"][name] = next(texts)
 
         json_report = json.dumps(report, indent=2)
         cb = QGuiApplication.clipboard()
@@ -504,6 +591,8 @@ class DebugDialog(QDialog):
 
     def reject(self):
         self.debug_widget.save_state()
+        if self.exception_queue is not None:
+            self.exception_queue.clear()
         super().reject()
 
 
@@ -0,0 +1,120 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Queue of exceptions waiting to be shown in the exception dialog. The same
+exception raised over and over (e.g. from a callback run on every map repaint)
+is kept only once with the number of occurrences, so that it costs next to
+nothing after the first time. Exceptions may be added from any thread."""
+
+import collections
+import os
+import threading
+import time
+
+MAX_ENTRIES = 20  # distinct exceptions queued at most, more are only counted
+MAX_FRAMES = 50  # innermost frames used for the fingerprint
+REPEAT_INTERVAL = 10.0  # seconds before a closed exception may open the dialog again
+MAX_REMEMBERED = 1000  # fingerprints remembered for the repeat interval
+
+
+def normalize_filename(filename):
+    return os.path.normcase(os.path.normpath(filename))
+
+
+def exception_fingerprint(etype, tb):
+    """Exceptions of the same type raised from the same places have the same
+    fingerprint (the message is left out - it often contains changing values)"""
+    locations = []
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        locations.append(
+            (normalize_filename(code.co_filename), code.co_name, tb.tb_lineno)
+        )
+        tb = tb.tb_next
+    return etype.__module__, etype.__qualname__, tuple(locations[-MAX_FRAMES:])
+
+
+class ExceptionEntry:
+    """Distinct exception in the queue - exc_info of its first occurrence"""
+
+    def __init__(self, fingerprint, exc_info, timestamp):
+        self.fingerprint = fingerprint
+        self.exc_info = exc_info
+        self.count = 1
+        self.first_time = self.last_time = timestamp
+
+
+class ExceptionQueue:
+    def __init__(
+        self,
+        max_entries=MAX_ENTRIES,
+        repeat_interval=REPEAT_INTERVAL,
+        suppress_repeats=False,
+    ):
+        self.max_entries = max_entries
+        self.repeat_interval = repeat_interval
+        # exceptions that have been shown once never open the dialog again
+        self.suppress_repeats = suppress_repeats
+
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # fingerprint -> ExceptionEntry
+        self.dropped = 0  # distinct exceptions not queued because it was full
+        self.closed_times = collections.OrderedDict()  # fingerprint -> time
+        self.suppressed = set()  # fingerprints ignored by the user
+
+    def add(self, exc_info, timestamp=None):
+        """Record an exception. Returns False if it has been ignored - it is the same
+        as one that has been suppressed or closed just now, or the queue is full."""
+        if timestamp is None:
+            timestamp = time.time()
+        fingerprint = exception_fingerprint(exc_info[0], exc_info[2])
+        with self.lock:
+            entry = self.entries.get(fingerprint)
+            if entry is not None:
+                entry.count += 1
+                entry.last_time = timestamp
+                return True
+            if fingerprint in self.suppressed:
+                return False
+            closed_time = self.closed_times.get(fingerprint)
+            if closed_time is not None and (
+                self.suppress_repeats or timestamp - closed_time < self.repeat_interval
+            ):
+                return False
+            if len(self.entries) >= self.max_entries:
+                self.dropped += 1
+                return False
+            self.entries[fingerprint] = ExceptionEntry(fingerprint, exc_info, timestamp)
+            return True
+
+    def snapshot(self):
+        """queued entries, oldest first"""
+        with self.lock:
+            return list(self.entries.values())
+
+    def suppress(self, fingerprint):
+        """ignore further occurrences of the exception"""
+        with self.lock:
+            self.suppressed.add(fingerprint)
+
+    def clear(self, timestamp=None):
+        """The queued exceptions have been seen - they are forgotten, only the time
+        is kept for the repeat interval. Their tracebacks (and frames) are released."""
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            for fingerprint in self.entries:
+                self.closed_times[fingerprint] = timestamp
+                self.closed_times.move_to_end(fingerprint)
+            while len(self.closed_times) > MAX_REMEMBERED:
+                self.closed_times.popitem(last=False)
+            self.entries.clear()
+            self.dropped = 0
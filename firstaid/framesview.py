@@ -8,19 +8,36 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 # ---------------------------------------------------------------------
+import html
+import linecache
 import os
 import traceback
+from types import FrameType
 
 from qgis.PyQt.QtCore import QAbstractListModel, Qt
 from qgis.PyQt.QtWidgets import QTreeView
 
 
+def stack_entries(frame):
+    """(filename, line number, function name) of the frame and its callers, oldest
+    first. Unlike traceback.extract_stack() this does not read any source code."""
+    entries = []
+    while frame is not None:
+        entries.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    entries.reverse()
+    return entries
+
+
 class FramesModel(QAbstractListModel):
     def __init__(self, tb, parent=None):
         QAbstractListModel.__init__(self, parent)
         if isinstance(tb, list):
             self.tb = None
             self.entries = tb
+        elif isinstance(tb, FrameType):
+            self.tb = None
+            self.entries = stack_entries(tb)
         else:
             self.tb = tb
             self.entries = traceback.extract_tb(tb)
@@ -37,9 +54,12 @@ class FramesModel(QAbstractListModel):
             return "%s [%s:%d]" % (entry[2], os.path.basename(entry[0]), entry[1])
         elif role == Qt.ItemDataRole.ToolTipRole:
             entry = self.entries[index.row()]
+            # source code is only read for the rows the user hovers over
+            source_line = linecache.getline(entry[0], entry[1]).strip()
             return (
                 "<b>Method:</b> %s\n<br>\n<b>Line:</b> %d\n<br><br>\n<b>Path:</b><br>\n%s"
-                % (entry[2], entry[1], entry[0])
+                "\n<br><br>\n<code>%s</code>"
+                % (entry[2], entry[1], entry[0], html.escape(source_line))
             )
 
     def headerData(self, section, orientation, role):
@@ -57,4 +77,5 @@ class FramesView(QTreeView):
         self.setRootIsDecorated(False)
 
     def setTraceback(self, tb):
+        """tb may be a traceback, a list of entries or a frame (its call stack)"""
         self.setModel(FramesModel(tb, self))
@@ -0,0 +1,108 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Handlers for NumPy arrays - loaded only if numpy has been imported already.
+Arrays show a summary and their rows in buckets, the data are never copied."""
+
+import time
+
+import numpy
+
+from .variablesview import custom_class_handlers, make_item, populate_range
+
+STATS_TIME_BUDGET = 0.1  # seconds for statistics of one array
+STATS_CHUNK_SIZE = 1000000  # elements processed at once
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            break
+        size /= 1024.0
+    return (
+        "{:.0f} {}".format(size, unit)
+        if unit == "B"
+        else "{:.1f} {}".format(size, unit)
+    )
+
+
+def iter_chunks(array):
+    """views of the array along the first axis with about STATS_CHUNK_SIZE elements"""
+    if array.ndim == 0:
+        yield array.reshape(1)
+        return
+    row_size = max(array.size // max(len(array), 1), 1)
+    rows = max(STATS_CHUNK_SIZE // row_size, 1)
+    for start in range(0, len(array), rows):
+        yield array[start : start + rows]
+
+
+def array_stats(array, time_budget=STATS_TIME_BUDGET):
+    """Minimum, maximum, mean and number of NaNs of a numeric array - as a list of
+    (name, value). The array is processed in chunks, if the time budget runs out,
+    the statistics are only from the part of the array processed so far."""
+    kind = array.dtype.kind
+    if kind not in "biuf" or array.size == 0:
+        return []
+    is_float = kind == "f"
+
+    start_time = time.perf_counter()
+    minimum = maximum = None
+    total = 0.0
+    count = nan_count = done = 0
+    for chunk in iter_chunks(array):
+        if is_float:
+            nans = int(numpy.count_nonzero(numpy.isnan(chunk)))
+            nan_count += nans
+            if nans == chunk.size:
+                done += chunk.size
+                continue
+            chunk_min, chunk_max = numpy.nanmin(chunk), numpy.nanmax(chunk)
+            total += float(numpy.nansum(chunk, dtype=numpy.float64))
+            count += chunk.size - nans
+        else:
+            chunk_min, chunk_max = chunk.min(), chunk.max()
+            total += float(chunk.sum(dtype=numpy.float64))
+            count += chunk.size
+        minimum = chunk_min if minimum is None else min(minimum, chunk_min)
+        maximum = chunk_max if maximum is None else max(maximum, chunk_max)
+        done += chunk.size
+        if time.perf_counter() - start_time > time_budget:
+            break
+
+    stats = [
+        ("min", minimum.item() if minimum is not None else None),
+        ("max", maximum.item() if maximum is not None else None),
+        ("mean", total / count if count else None),
+    ]
+    if is_float:
+        stats.append(("nan_count", nan_count))
+    if done < array.size:
+        stats.append(
+            (
+                "stats_from",
+                "first {} of {} elements (time limit)".format(done, array.size),
+            )
+        )
+    return stats
+
+
+def handle_ndarray(value, parent):
+    make_item("shape", value.shape, parent)
+    make_item("dtype", str(value.dtype), parent)
+    make_item("nbytes", format_size(value.nbytes), parent)
+    for name, stat in array_stats(value):
+        make_item(name, stat, parent)
+    if value.ndim > 0:
+        populate_range(parent, value, 0, len(value))
+
+
+custom_class_handlers[numpy.ndarray] = handle_ndarray
@@ -0,0 +1,81 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Handlers for pandas objects - loaded only if pandas has been imported already.
+Rows are shown in buckets, statistics of columns are computed with NumPy."""
+
+import time
+
+import pandas
+
+from .handlers_numpy import STATS_TIME_BUDGET, array_stats, format_size
+from .variablesview import (
+    custom_class_handlers,
+    custom_index_formats,
+    make_item,
+    populate_range,
+)
+
+
+def dataframe_rows(df, start, stop):
+    return (df.iloc[i] for i in range(start, stop))
+
+
+def series_values(series, start, stop):
+    return series.iloc[start:stop].tolist()
+
+
+def column_stats(series, time_budget):
+    if not pandas.api.types.is_numeric_dtype(series.dtype):
+        return None
+    try:
+        values = series.to_numpy()
+    except (TypeError, ValueError):  # e.g. nullable dtypes with missing values
+        return None
+    return dict(array_stats(values, time_budget))
+
+
+def handle_DataFrame(value, parent):
+    make_item("shape", value.shape, parent)
+    make_item("dtypes", {str(c): str(t) for c, t in value.dtypes.items()}, parent)
+    make_item("memory", format_size(int(value.memory_usage(deep=False).sum())), parent)
+
+    # statistics of numeric columns, all of them share the time budget
+    stats = {}
+    deadline = time.perf_counter() + STATS_TIME_BUDGET
+    for column, series in value.items():
+        budget = deadline - time.perf_counter()
+        if budget <= 0:
+            stats["..."] = "time limit reached"
+            break
+        column_stat = column_stats(series, budget)
+        if column_stat is not None:
+            stats[str(column)] = column_stat
+    make_item("stats", stats, parent)
+
+    populate_range(parent, value, 0, len(value), dataframe_rows)
+
+
+def handle_Series(value, parent):
+    make_item("name", value.name, parent)
+    make_item("length", len(value), parent)
+    make_item("dtype", str(value.dtype), parent)
+    make_item("memory", format_size(int(value.memory_usage(deep=False))), parent)
+    for name, stat in (column_stats(value, STATS_TIME_BUDGET) or {}).items():
+        make_item(name, stat, parent)
+    populate_range(parent, value, 0, len(value), series_values)
+
+
+custom_class_handlers[pandas.DataFrame] = handle_DataFrame
+custom_class_handlers[pandas.Series] = handle_Series
+# rows are shown by position, [] would select a column or a label
+custom_index_formats[pandas.DataFrame] = ".iloc[{}]"
+custom_index_formats[pandas.Series] = ".iloc[{}]"
@@ -1,20 +1,67 @@
+import itertools
+import threading
+
 from qgis.core import (
+    Qgis,
+    QgsApplication,
     QgsCoordinateReferenceSystem,
     QgsFeature,
+    QgsFeatureRequest,
     QgsField,
+    QgsFields,
     QgsGeometry,
     QgsMapLayer,
     QgsPoint,
     QgsPointLocator,
+    QgsRasterBandStats,
+    QgsRasterBlockFeedback,
     QgsRasterDataProvider,
     QgsRasterLayer,
     QgsRectangle,
+    QgsTask,
     QgsVectorDataProvider,
     QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
     QgsVertexId,
+    QgsWkbTypes,
+)
+
+from qgis.PyQt.QtCore import QTimer
+
+from .variablesview import (
+    OnDemandTreeItem,
+    PendingTreeItem,
+    VariablesTreeItem,
+    append_children,
+    custom_class_handlers,
+    item_updates,
+    make_item,
+    make_unparented_item,
+    populate_range,
 )
 
-from .variablesview import custom_class_handlers, make_item
+FEATURES_PAGE_SIZE = 100  # features read in a task when a page is expanded
+FEATURES_LIMIT = 100000  # at most this many features are offered for browsing
+PREVIEW_ATTRIBUTES = 20  # features are read only with the first attributes
+WKT_PREVIEW_VERTICES = 100  # geometries with more vertices get an abbreviated WKT
+SIMPLIFY_FACTOR = 0.001  # tolerance of the simplified preview (x size of the geometry)
+RASTER_SAMPLE_SIZE = 250000  # pixels read for statistics of a raster band
+RASTER_STATS_TIME_BUDGET = 5  # seconds, reading is canceled after that
+
+# tasks that have not finished yet - Python tasks need a reference kept while running
+running_tasks = set()
+# layer id -> FeatureCount, so that the features of a layer are counted only once
+feature_counts = {}
+
+
+def task_result(task, exception, result, empty=None):
+    """(result, error message) of a task made with QgsTask.fromFunction() - its
+    falsy results (0, empty list) come as None, they are returned as empty"""
+    if task.isCanceled():
+        return None, "canceled"
+    if exception is not None:
+        return None, "failed: {}".format(exception)
+    return (empty if result is None else result), None
 
 
 def handle_QgsCoordinateReferenceSystem(value, parent):
@@ -32,6 +79,16 @@ def handle_QgsFeature(value, parent):
     make_item("attributes", value.attributes(), parent)
 
 
+def handle_QgsFields(value, parent):
+    populate_range(
+        parent,
+        value,
+        0,
+        value.count(),
+        lambda fields, start, stop: [fields.at(i) for i in range(start, stop)],
+    )
+
+
 def handle_QgsField(value, parent):
     make_item("name", value.name(), parent)
     make_item("type", value.type(), parent)
@@ -41,10 +98,110 @@ def handle_QgsField(value, parent):
     make_item("comment", value.comment(), parent)
 
 
+class GeometryPart:
+    """part of a geometry, shown with its rings"""
+
+    __slots__ = ("geometry", "part")
+
+    def __init__(self, geometry, part):
+        self.geometry = geometry  # QgsAbstractGeometry
+        self.part = part
+
+    def __repr__(self):
+        return "<part {}: {} rings>".format(
+            self.part, self.geometry.ringCount(self.part)
+        )
+
+
+class GeometryRing:
+    """ring of a part of a geometry, shown with its vertices"""
+
+    __slots__ = ("geometry", "part", "ring")
+
+    def __init__(self, geometry, part, ring):
+        self.geometry = geometry
+        self.part = part
+        self.ring = ring
+
+    def __repr__(self):
+        return "<ring {}: {} vertices>".format(
+            self.ring, self.geometry.vertexCount(self.part, self.ring)
+        )
+
+
+def wkt_preview(value, vertex_count):
+    """WKT of small geometries, the first vertices of large ones"""
+    if vertex_count <= WKT_PREVIEW_VERTICES:
+        return value.asWkt()
+    coords = [
+        "{} {}".format(point.x(), point.y())
+        for point in itertools.islice(value.vertices(), WKT_PREVIEW_VERTICES)
+    ]
+    return "{} ({}, … {} more vertices)".format(
+        QgsWkbTypes.displayString(value.wkbType()),
+        ", ".join(coords),
+        vertex_count - WKT_PREVIEW_VERTICES,
+    )
+
+
+def validity(value):
+    errors = value.validateGeometry()
+    return [error.what() for error in errors] if errors else "valid"
+
+
+def simplified(value):
+    box = value.boundingBox()
+    return value.simplify(max(box.width(), box.height()) * SIMPLIFY_FACTOR)
+
+
 def handle_QgsGeometry(value, parent):
-    # TODO: improve
-    make_item("wkb_type", value.wkbType(), parent)
-    make_item("wkt", value.exportToWkt(), parent)
+    # only what is cheap to get even for huge geometries, the rest on demand
+    make_item("type", QgsWkbTypes.displayString(value.wkbType()), parent)
+    if value.isNull():
+        return
+    geometry = value.constGet()
+    vertex_count = geometry.nCoordinates()
+    make_item("partCount", geometry.partCount(), parent)
+    make_item("vertexCount", vertex_count, parent)
+    make_item("boundingBox", value.boundingBox(), parent)
+    make_item("area", value.area(), parent)
+    make_item("length", value.length(), parent)
+    make_item("wkt", wkt_preview(value, vertex_count), parent)
+    OnDemandTreeItem("validity", lambda: validity(value), parent)
+    OnDemandTreeItem("fullWkt", value.asWkt, parent)
+    OnDemandTreeItem("simplified", lambda: simplified(value), parent)
+    populate_range(
+        parent,
+        geometry,
+        0,
+        geometry.partCount(),
+        lambda g, start, stop: [GeometryPart(g, i) for i in range(start, stop)],
+    )
+
+
+def handle_GeometryPart(value, parent):
+    populate_range(
+        parent,
+        value,
+        0,
+        value.geometry.ringCount(value.part),
+        lambda p, start, stop: [
+            GeometryRing(p.geometry, p.part, i) for i in range(start, stop)
+        ],
+    )
+
+
+def handle_GeometryRing(value, parent):
+    populate_range(
+        parent,
+        value,
+        0,
+        value.geometry.vertexCount(value.part, value.ring),
+        lambda r, start, stop: [
+            r.geometry.vertexAt(QgsVertexId(r.part, r.ring, i))
+            for i in range(start, stop)
+        ],
+    )
 
 
 def handle_QgsMapLayer(value, parent):
@@ -65,10 +222,159 @@ def handle_QgsRasterDataProvider(value, parent):
     handle_QgsDataProvider(value, parent)
 
 
+class RasterBand:
+    """band of a raster layer - only its metadata are shown, no pixels are read
+    unless statistics are asked for"""
+
+    __slots__ = ("layer", "band")
+
+    def __init__(self, layer, band):
+        self.layer = layer
+        self.band = band
+
+    def __repr__(self):
+        return "<band {}: {}>".format(self.band, self.layer.bandName(self.band))
+
+
+class BandStatisticsTask(QgsTask):
+    """Statistics of a band from pixels read at a lower resolution (GDAL uses
+    overviews if there are any) with a clone of the provider. Canceling the task
+    cancels the reading too, on_finished(exception, stats) is called at the end
+    like with QgsTask.fromFunction()."""
+
+    def __init__(self, description, provider, band, sample_size, on_finished):
+        QgsTask.__init__(self, description)
+        self.provider = provider
+        self.band = band
+        self.sample_size = sample_size
+        self.on_finished = on_finished
+        self.feedback = QgsRasterBlockFeedback()
+        self.stats = None
+        self.exception = None
+
+    def run(self):
+        if hasattr(Qgis, "RasterBandStatistic"):
+            all_stats = Qgis.RasterBandStatistic.All
+        else:
+            all_stats = QgsRasterBandStats.All
+        timer = threading.Timer(RASTER_STATS_TIME_BUDGET, self.feedback.cancel)
+        timer.start()
+        try:
+            self.stats = self.provider.bandStatistics(
+                self.band, all_stats, QgsRectangle(), self.sample_size, self.feedback
+            )
+        except Exception as e:
+            self.exception = e
+            return False
+        finally:
+            timer.cancel()
+        if self.isCanceled():
+            return False
+        if self.feedback.isCanceled():
+            self.exception = RuntimeError(
+                "reading took more than {} s".format(RASTER_STATS_TIME_BUDGET)
+            )
+            return False
+        return True
+
+    def cancel(self):
+        self.feedback.cancel()
+        QgsTask.cancel(self)
+
+    def finished(self, result):
+        self.on_finished(self.exception, self.stats if result else None)
+
+
+class BandStatisticsItem(PendingTreeItem):
+    """Statistics of a raster band, computed in a task when expanded - one child
+    per statistic, the item itself tells whether they are exact or sampled"""
+
+    __slots__ = ("band", "task")
+
+    STATISTICS = ("min", "max", "mean", "stdDev", "pixels")
+
+    def __init__(self, band, parent):
+        PendingTreeItem.__init__(self, "statistics", parent, "expand to compute")
+        self.band = band
+        self.task = None
+        self.has_children = True
+
+    def populate_children(self):
+        self.populated_children = True
+        self.set_status("computing…")
+        stat_items = [PendingTreeItem(name, self) for name in self.STATISTICS]
+
+        layer = self.band.layer
+        pixels = layer.width() * layer.height()
+        sample_size = RASTER_SAMPLE_SIZE if pixels > RASTER_SAMPLE_SIZE else 0
+
+        def _finished(exception, result=None):
+            result, error = task_result(self.task, exception, result)
+            running_tasks.discard(self.task)
+            self.task = None
+            if error is not None:
+                self.set_status(error)
+                for item in stat_items:
+                    item.set_status(error)
+                return
+            values = (
+                result.minimumValue,
+                result.maximumValue,
+                result.mean,
+                result.stdDev,
+                result.elementCount,
+            )
+            for item, value in zip(stat_items, values):
+                item.set_value(value)
+            self.set_value(
+                "exact"
+                if sample_size == 0
+                else "sampled: {} of {} pixels".format(result.elementCount, pixels)
+            )
+
+        self.task = BandStatisticsTask(
+            "Statistics of band {} of {}".format(self.band.band, layer.name()),
+            layer.dataProvider().clone(),
+            self.band.band,
+            sample_size,
+            _finished,
+        )
+        running_tasks.add(self.task)
+        QgsApplication.taskManager().addTask(self.task)
+
+    def release(self):
+        if self.task is not None:
+            self.task.cancel()
+        PendingTreeItem.release(self)
+
+
+def handle_RasterBand(value, parent):
+    provider = value.layer.dataProvider()
+    make_item("name", value.layer.bandName(value.band), parent)
+    make_item("dataType", provider.dataType(value.band), parent)
+    if provider.sourceHasNoDataValue(value.band):
+        make_item("noData", provider.sourceNoDataValue(value.band), parent)
+    else:
+        make_item("noData", None, parent)
+    BandStatisticsItem(value, parent)
+
+
 def handle_QgsRasterLayer(value, parent):
-    # TODO: improve
+    # metadata only - no pixels are read here
     handle_QgsMapLayer(value, parent)
-    make_item("dataProvider", value.dataProvider(), parent)
+    provider = value.dataProvider()
+    make_item("width", value.width(), parent)
+    make_item("height", value.height(), parent)
+    make_item("bandCount", value.bandCount(), parent)
+    make_item("hasOverviews", provider.hasPyramids(), parent)
+    make_item("dataProvider", provider, parent)
+    populate_range(
+        parent,
+        value,
+        1,
+        value.bandCount() + 1,
+        lambda layer, start, stop: [RasterBand(layer, b) for b in range(start, stop)],
+    )
 
 
 def handle_QgsRectangle(value, parent):
@@ -83,12 +389,284 @@ def handle_QgsVectorDataProvider(value, parent):
     make_item("capabilities", value.capabilities(), parent)
 
 
+def provider_clone(layer):
+    """Clone of the layer's provider to be used in a task, or None if the layer
+    has edits that are not saved - the provider does not know about them"""
+    edit_buffer = layer.editBuffer()
+    if edit_buffer is not None and edit_buffer.isModified():
+        return None
+    return layer.dataProvider().clone()
+
+
+def count_features(task, provider, source):
+    """Number of features - runs in a QgsTask, the provider clone and the source
+    (QgsVectorLayerFeatureSource) are made in the main thread. The provider is
+    asked first (e.g. a database server knows the count), features are only
+    scanned if it does not know."""
+    if provider is not None:
+        count = provider.featureCount()
+        if count >= 0:
+            return count
+    request = QgsFeatureRequest()
+    request.setNoAttributes()
+    if hasattr(Qgis, "FeatureRequestFlag"):
+        request.setFlags(Qgis.FeatureRequestFlag.NoGeometry)
+    else:
+        request.setFlags(QgsFeatureRequest.NoGeometry)
+    count = 0
+    for _ in source.getFeatures(request):
+        if task.isCanceled():
+            return None
+        count += 1
+    return count
+
+
+def features_extent(task, provider, source):
+    """Extent of geometries of features - runs in a QgsTask like count_features(),
+    geometries are only read if the provider does not know the extent"""
+    if provider is not None:
+        extent = provider.extent()
+        if not extent.isEmpty():
+            return extent
+    extent = QgsRectangle()
+    extent.setMinimal()
+    request = QgsFeatureRequest()
+    request.setNoAttributes()
+    for feature in source.getFeatures(request):
+        if task.isCanceled():
+            return None
+        if feature.hasGeometry():
+            extent.combineExtentWith(feature.geometry().boundingBox())
+    return extent
+
+
+def read_features(task, source, request, skip):
+    """Features of a page - runs in a QgsTask like count_features()"""
+    features = []
+    for feature in itertools.islice(source.getFeatures(request), skip, None):
+        if task.isCanceled():
+            return None
+        features.append(QgsFeature(feature))
+    return features
+
+
+class FeatureCount:
+    """Counting features may mean a full scan on the server (e.g. PostGIS, WFS),
+    so it is done in a task - only one for a layer, shared by all items showing
+    the layer. The count is kept until the data of the layer change. The task
+    is canceled when there are no items waiting for it anymore."""
+
+    def __init__(self, layer):
+        self.layer = layer  # until invalidated
+        self.layer_id = layer.id()
+        self.items = []  # items waiting for the count
+        self.count = None
+        self.task = QgsTask.fromFunction(
+            "Counting features of {}".format(layer.name()),
+            count_features,
+            provider_clone(layer),
+            QgsVectorLayerFeatureSource(layer),
+            on_finished=self.finished,
+        )
+        running_tasks.add(self.task)
+        layer.dataChanged.connect(self.invalidate)
+        layer.willBeDeleted.connect(self.invalidate)
+        QgsApplication.taskManager().addTask(self.task)
+
+    @staticmethod
+    def for_layer(layer):
+        counting = feature_counts.get(layer.id())
+        if counting is None:
+            counting = feature_counts[layer.id()] = FeatureCount(layer)
+        return counting
+
+    def add_item(self, item):
+        if self.count is not None:
+            item.set_value(self.count)
+        else:
+            self.items.append(item)
+
+    def remove_item(self, item):
+        if item in self.items:
+            self.items.remove(item)
+            # not right away - after a step the layer is usually shown again
+            QTimer.singleShot(0, self.cancel_if_unused)
+
+    def cancel_if_unused(self):
+        if not self.items and self.task is not None:
+            self.invalidate()
+            self.task.cancel()
+
+    def finished(self, exception, result=None):
+        count, error = task_result(self.task, exception, result, 0)
+        running_tasks.discard(self.task)
+        self.task = None
+        items, self.items = self.items, []
+        if error is not None:
+            self.invalidate()  # counted again next time
+            for item in items:
+                item.set_status(error)
+        else:
+            self.count = count
+            for item in items:
+                item.set_value(count)
+
+    def invalidate(self):
+        """the count is not used for new items anymore"""
+        if feature_counts.get(self.layer_id) is self:
+            del feature_counts[self.layer_id]
+        if self.layer is not None:
+            try:
+                self.layer.dataChanged.disconnect(self.invalidate)
+                self.layer.willBeDeleted.disconnect(self.invalidate)
+            except (RuntimeError, TypeError):
+                pass  # the layer has been deleted meanwhile
+            self.layer = None
+
+
+class FeatureCountItem(PendingTreeItem):
+    __slots__ = ("counting",)
+
+    def __init__(self, layer, parent):
+        PendingTreeItem.__init__(self, "featureCount", parent)
+        self.counting = FeatureCount.for_layer(layer)
+        self.counting.add_item(self)
+
+    def release(self):
+        self.counting.remove_item(self)
+        PendingTreeItem.release(self)
+
+
+class LayerExtentItem(PendingTreeItem):
+    """Extent of features of a vector layer - may need to read all geometries,
+    so it is computed in a task only when expanded"""
+
+    __slots__ = ("layer", "task")
+
+    def __init__(self, layer, parent):
+        PendingTreeItem.__init__(self, "extent", parent, "expand to compute")
+        self.layer = layer
+        self.task = None
+        self.has_children = True
+
+    def populate_children(self):
+        self.populated_children = True
+        self.set_status("computing…")
+        bound_items = [
+            PendingTreeItem(name, self) for name in ("xMin", "yMin", "xMax", "yMax")
+        ]
+
+        def _finished(exception, result=None):
+            result, error = task_result(self.task, exception, result)
+            running_tasks.discard(self.task)
+            self.task = None
+            if error is not None:
+                self.set_status(error)
+                for item in bound_items:
+                    item.set_status(error)
+                return
+            bounds = (
+                result.xMinimum(),
+                result.yMinimum(),
+                result.xMaximum(),
+                result.yMaximum(),
+            )
+            for item, value in zip(bound_items, bounds):
+                item.set_value(value)
+            self.set_value(result)
+
+        self.task = QgsTask.fromFunction(
+            "Extent of features of {}".format(self.layer.name()),
+            features_extent,
+            provider_clone(self.layer),
+            QgsVectorLayerFeatureSource(self.layer),
+            on_finished=_finished,
+        )
+        running_tasks.add(self.task)
+        QgsApplication.taskManager().addTask(self.task)
+
+    def release(self):
+        if self.task is not None:
+            self.task.cancel()
+        PendingTreeItem.release(self)
+
+
+class FeaturesPageItem(VariablesTreeItem):
+    """Page of features of a vector layer - when expanded, the features are read
+    in a task. A full page ends with the next page."""
+
+    __slots__ = ("start", "task", "status")
+
+    def __init__(self, name, layer, parent, start=0):
+        VariablesTreeItem.__init__(self, name, layer, parent)
+        self.start = start
+        self.task = None
+        self.status = None  # e.g. that reading has failed
+        self.has_children = True
+
+    def val(self):
+        if self.status is not None:
+            return self.status
+        return "features from {}".format(self.start)
+
+    def type_name(self):
+        return "features"
+
+    def populate_children(self):
+        self.populated_children = True
+        layer = self.value
+        request = QgsFeatureRequest()
+        # requests have no offset - features of the previous pages are skipped,
+        # one more is read to find out whether there is a next page
+        request.setLimit(self.start + FEATURES_PAGE_SIZE + 1)
+        if layer.fields().count() > PREVIEW_ATTRIBUTES:
+            request.setSubsetOfAttributes(list(range(PREVIEW_ATTRIBUTES)))
+
+        def _finished(exception, result=None):
+            features, self.status = task_result(self.task, exception, result, [])
+            running_tasks.discard(self.task)
+            self.task = None
+            item_updates.itemChanged.emit(self)
+            if self.status is not None:
+                return
+            children = [
+                make_unparented_item(str(feature.id()), feature)
+                for feature in features[:FEATURES_PAGE_SIZE]
+            ]
+            next_start = self.start + FEATURES_PAGE_SIZE
+            if len(features) > FEATURES_PAGE_SIZE and next_start < FEATURES_LIMIT:
+                children.append(FeaturesPageItem("more", layer, None, next_start))
+            append_children(self, children)
+
+        self.status = "reading…"
+        self.task = QgsTask.fromFunction(
+            "Reading features of {}".format(layer.name()),
+            read_features,
+            QgsVectorLayerFeatureSource(layer),
+            request,
+            self.start,
+            on_finished=_finished,
+        )
+        running_tasks.add(self.task)
+        QgsApplication.taskManager().addTask(self.task)
+
+    def release(self):
+        if self.task is not None:
+            self.task.cancel()
+        VariablesTreeItem.release(self)
+
+
 def handle_QgsVectorLayer(value, parent):
-    # TODO: improve
-    handle_QgsMapLayer(value, parent)
-    make_item("featureCount", value.pendingFeatureCount(), parent)
-    make_item("fields", value.pendingFields().toList(), parent)
+    # the extent is not asked for directly, it may need a scan of all features
+    make_item("id", value.id(), parent)
+    make_item("name", value.name(), parent)
+    make_item("crs", value.crs(), parent)
+    make_item("providerType", value.providerType(), parent)
+    FeatureCountItem(value, parent)
+    LayerExtentItem(value, parent)
+    make_item("fields", value.fields(), parent)
     make_item("dataProvider", value.dataProvider(), parent)
+    FeaturesPageItem("features", value, parent)
 
 
 def handle_QgsVertexId(value, parent):
@@ -112,12 +690,16 @@ custom_class_handlers[QgsCoordinateReferenceSystem] = (
 )
 custom_class_handlers[QgsFeature] = handle_QgsFeature
 custom_class_handlers[QgsField] = handle_QgsField
+custom_class_handlers[QgsFields] = handle_QgsFields
 custom_class_handlers[QgsGeometry] = handle_QgsGeometry
+custom_class_handlers[GeometryPart] = handle_GeometryPart
+custom_class_handlers[GeometryRing] = handle_GeometryRing
 custom_class_handlers[QgsMapLayer] = handle_QgsMapLayer
 custom_class_handlers[QgsPoint] = handle_QgsPoint
 custom_class_handlers[QgsPointLocator.Match] = handle_QgsPointLocator_Match
 custom_class_handlers[QgsRasterDataProvider] = handle_QgsRasterDataProvider
 custom_class_handlers[QgsRasterLayer] = handle_QgsRasterLayer
+custom_class_handlers[RasterBand] = handle_RasterBand
 custom_class_handlers[QgsRectangle] = handle_QgsRectangle
 custom_class_handlers[QgsVectorDataProvider] = handle_QgsVectorDataProvider
 custom_class_handlers[QgsVectorLayer] = handle_QgsVectorLayer
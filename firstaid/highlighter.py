@@ -1,223 +0,0 @@
-from qgis.PyQt.QtGui import QTextCharFormat, QSyntaxHighlighter
-from qgis.PyQt.QtCore import QRegularExpression
-from qgis.PyQt.QtGui import QColor, QFont
-
-
-def format(color, style=""):
-    """Return a QTextCharFormat with the given attributes."""
-    _color = QColor()
-    _color.setNamedColor(color)
-
-    _format = QTextCharFormat()
-    _format.setForeground(_color)
-    if "bold" in style:
-        _format.setFontWeight(QFont.Weight.Bold)
-    if "italic" in style:
-        _format.setFontItalic(True)
-
-    return _format
-
-
-# Syntax styles that can be shared by all languages
-STYLES = {
-    "keyword": format("blue"),
-    "operator": format("red"),
-    "brace": format("darkGray"),
-    "defclass": format("black", "bold"),
-    "string": format("crimson"),
-    "string2": format("darkgrey", "italic"),
-    "comment": format("darkgrey", "italic"),
-    "self": format("dodgerblue"),
-    "numbers": format("brown"),
-}
-
-
-class PythonHighlighter(QSyntaxHighlighter):
-    """Syntax highlighter for the Python language."""
-
-    # Python keywords
-    keywords = [
-        "and",
-        "assert",
-        "break",
-        "class",
-        "continue",
-        "def",
-        "del",
-        "elif",
-        "else",
-        "except",
-        "exec",
-        "finally",
-        "for",
-        "from",
-        "global",
-        "if",
-        "import",
-        "in",
-        "is",
-        "lambda",
-        "not",
-        "or",
-        "pass",
-        "print",
-        "raise",
-        "return",
-        "try",
-        "while",
-        "yield",
-        "None",
-        "True",
-        "False",
-    ]
-
-    # Python operators
-    operators = [
-        "=",
-        # Comparison
-        "==",
-        "!=",
-        "<",
-        "<=",
-        ">",
-        ">=",
-        # Arithmetic
-        r"\+",
-        "-",
-        r"\*",
-        "/",
-        "//",
-        r"\%",
-        r"\*\*",
-        # In-place
-        r"\+=",
-        "-=",
-        r"\*=",
-        "/=",
-        r"\%=",
-        # Bitwise
-        r"\^",
-        r"\|",
-        r"\&",
-        r"\~",
-        ">>",
-        "<<",
-    ]
-
-    # Python braces
-    braces = [
-        r"\{",
-        r"\}",
-        r"\(",
-        r"\)",
-        r"\[",
-        r"\]",
-    ]
-
-    def __init__(self, document):
-        QSyntaxHighlighter.__init__(self, document)
-
-        # Multi-line strings (expression, flag, style)
-        # FIXME: The triple-quotes in these two lines will mess up the
-        # syntax highlighting from this point onward
-        self.tri_single = (QRegularExpression("'''"), 1, STYLES["string2"])
-        self.tri_double = (QRegularExpression('"""'), 2, STYLES["string2"])
-
-        rules = []
-
-        # Keyword, operator, and brace rules
-        rules += [
-            (r"\b" + w + r"\b", 0, STYLES["keyword"])
-            for w in PythonHighlighter.keywords
-        ]
-        rules += [(o, 0, STYLES["operator"]) for o in PythonHighlighter.operators]
-        rules += [(b, 0, STYLES["brace"]) for b in PythonHighlighter.braces]
-
-        # All other rules
-        rules += [
-            # 'self'
-            (r"\bself\b", 0, STYLES["self"]),
-            # Double-quoted string, possibly containing escape sequences
-            (r'"[^"\\]*(\\.[^"\\]*)*"', 0, STYLES["string"]),
-            # Single-quoted string, possibly containing escape sequences
-            (r"'[^'\\]*(\\.[^'\\]*)*'", 0, STYLES["string"]),
-            # 'def' followed by an identifier
-            (r"\bdef\b\s*(\w+)", 1, STYLES["defclass"]),
-            # 'class' followed by an identifier
-            (r"\bclass\b\s*(\w+)", 1, STYLES["defclass"]),
-            # Numeric literals
-            (r"\b[+-]?[0-9]+[lL]?\b", 0, STYLES["numbers"]),
-            (r"\b[+-]?0[xX][0-9A-Fa-f]+[lL]?\b", 0, STYLES["numbers"]),
-            (r"\b[+-]?[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?\b", 0, STYLES["numbers"]),
-            # From '#' until a newline
-            (r"#[^\n]*", 0, STYLES["comment"]),
-        ]
-
-        # Build a QRegularExpression for each pattern
-        self.rules = [
-            (QRegularExpression(pat), index, fmt) for (pat, index, fmt) in rules
-        ]
-
-    def highlightBlock(self, text):
-        """Apply syntax highlighting to the given block of text."""
-        # Do other syntax formatting
-        for expression, nth, format in self.rules:
-            matches = expression.globalMatch(text)
-            while matches.hasNext():
-                match = matches.next()
-                # We actually want the index of the nth match
-                index = match.capturedStart(nth)
-                length = match.capturedLength(nth)
-                self.setFormat(index, length, format)
-
-        self.setCurrentBlockState(0)
-
-        # Do multi-line strings
-        in_multiline = self.match_multiline(text, *self.tri_single)
-        if not in_multiline:
-            in_multiline = self.match_multiline(text, *self.tri_double)
-
-    def match_multiline(
-        self, text: str, delimiter: QRegularExpression, in_state, style
-    ):
-        """Performs highlighting of multi-line strings. ``delimiter`` should be a
-        ``QRegularExpression`` for triple-single-quotes or triple-double-quotes, and
-        ``in_state`` should be a unique integer to represent the corresponding
-        state changes when inside those strings. Returns True if we're still
-        inside a multi-line string when this function is finished.
-        """
-        # If inside triple-single quotes, start at 0
-        if self.previousBlockState() == in_state:
-            start = 0
-            add = 0
-        # Otherwise, look for the delimiter on this line
-        else:
-            match = delimiter.match(text)
-            start = match.capturedStart()
-            # Move past this match
-            add = match.capturedLength()
-
-        # As long as there's a delimiter match on this line...
-        while start >= 0:
-            # Look for the ending delimiter
-            match = delimiter.match(text, start + add)
-            end = match.capturedStart()
-            # Ending delimiter on this line?
-            if end >= add:
-                length = end - start + add + match.capturedLength()
-                self.setCurrentBlockState(0)
-            # No; multi-line string
-            else:
-                self.setCurrentBlockState(in_state)
-                length = len(text) - start + add
-            # Apply formatting
-            self.setFormat(start, length, style)
-            # Look for the next match
-            match = delimiter.match(text, start + length)
-            start = match.capturedStart()
-
-        # Return True if still inside a multi-line string, False otherwise
-        if self.currentBlockState() == in_state:
-            return True
-        else:
-            return False
@@ -0,0 +1,89 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Messages of logpoints - kept free of any GUI code, the traced code only appends
+to the buffer and the view picks up new messages when it gets to it."""
+
+import collections
+import os
+import threading
+import time
+
+
+class LogBuffer:
+    """Ring buffer of logpoint messages: when full, the oldest messages are dropped.
+
+    Entries are tuples (sequence number, time, filename, line number, message).
+    Sequence numbers only grow, so views can ask just for the entries added since
+    the last time they looked. Traced threads append while the view reads, so
+    the entries are only accessed with the lock held."""
+
+    def __init__(self, capacity=10000):
+        self.lock = threading.Lock()
+        self.entries = collections.deque(maxlen=capacity)
+        self.count = 0  # sequence number of the last appended entry
+        self.dropped = 0  # entries that did not fit into the buffer
+
+    def append(self, filename, line_no, message):
+        timestamp = time.time()
+        with self.lock:
+            if len(self.entries) == self.entries.maxlen:
+                self.dropped += 1
+            self.count += 1
+            self.entries.append((self.count, timestamp, filename, line_no, message))
+
+    def set_capacity(self, capacity):
+        with self.lock:
+            if capacity != self.entries.maxlen:
+                self.entries = collections.deque(self.entries, maxlen=capacity)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.dropped = 0
+
+    def since(self, seq):
+        """entries with sequence number greater than seq (oldest first)"""
+        new_entries = []
+        with self.lock:
+            for entry in reversed(self.entries):
+                if entry[0] <= seq:
+                    break
+                new_entries.append(entry)
+        new_entries.reverse()
+        return new_entries
+
+    def matching(self, text, entries=None):
+        """entries whose formatted line contains the text (case insensitive)"""
+        if entries is None:
+            with self.lock:
+                entries = list(self.entries)
+        if not text:
+            return entries
+        text = text.lower()
+        return [e for e in entries if text in format_entry(e).lower()]
+
+    def export(self, path, text=None):
+        """write (matching) entries to a text file, one per line"""
+        with open(path, "w", encoding="utf-8") as f:
+            for entry in self.matching(text):
+                f.write(format_entry(entry) + "\n")
+
+
+def format_entry(entry):
+    _, timestamp, filename, line_no, message = entry
+    return "{}.{:03d} {}:{}  {}".format(
+        time.strftime("%H:%M:%S", time.localtime(timestamp)),
+        int(timestamp * 1000) % 1000,
+        os.path.basename(filename),
+        line_no,
+        message,
+    )
@@ -0,0 +1,111 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+from qgis.PyQt.QtCore import QTimer
+from qgis.PyQt.QtGui import QFontDatabase
+from qgis.PyQt.QtWidgets import (
+    QFileDialog,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QPlainTextEdit,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from .logpoints import format_entry
+
+
+class LogpointsView(QWidget):
+    """Shows messages of logpoints. The buffer is polled with a timer, so hitting
+    a logpoint never touches the GUI."""
+
+    def __init__(self, log, parent=None):
+        QWidget.__init__(self, parent)
+        self.log = log
+        self.shown_seq = 0  # sequence number of the last entry shown
+
+        self.edit_filter = QLineEdit()
+        self.edit_filter.setPlaceholderText("Filter")
+        self.edit_filter.textChanged.connect(self.refresh)
+        self.label_count = QLabel()
+        button_clear = QPushButton("Clear")
+        button_clear.clicked.connect(self.on_clear)
+        button_export = QPushButton("Export…")
+        button_export.clicked.connect(self.on_export)
+
+        self.text_view = QPlainTextEdit()
+        self.text_view.setReadOnly(True)
+        self.text_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_view.setFont(
+            QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        )
+        self.text_view.setMaximumBlockCount(log.entries.maxlen)
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.edit_filter)
+        top_layout.addWidget(self.label_count)
+        top_layout.addWidget(button_clear)
+        top_layout.addWidget(button_export)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(top_layout)
+        layout.addWidget(self.text_view)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(250)
+        self.timer.timeout.connect(self.update_view)
+        self.timer.start()
+
+    def update_view(self):
+        """append entries added since the last update"""
+        if self.log.count == self.shown_seq:
+            return
+        new_entries = self.log.since(self.shown_seq)
+        if new_entries:
+            # not log.count - more entries may have been appended meanwhile
+            self.shown_seq = new_entries[-1][0]
+        entries = self.log.matching(self.edit_filter.text(), new_entries)
+        if entries:
+            self.text_view.appendPlainText("\n".join(format_entry(e) for e in entries))
+        self.update_count()
+
+    def refresh(self):
+        """show all (matching) entries again - e.g. when the filter has changed"""
+        self.text_view.clear()
+        self.shown_seq = 0
+        self.update_view()
+        self.update_count()
+
+    def update_count(self):
+        text = "{} messages".format(len(self.log.entries))
+        if self.log.dropped:
+            text += " ({} dropped)".format(self.log.dropped)
+        self.label_count.setText(text)
+
+    def on_clear(self):
+        self.log.clear()
+        self.refresh()
+
+    def on_export(self):
+        args = QFileDialog.getSaveFileName(
+            self, "Export log", "", "Text files (*.txt *.log);;All files (*)"
+        )
+        path = args[0] if isinstance(args, tuple) else args
+        if not path:
+            return
+        try:
+            self.log.export(path, self.edit_filter.text())
+        except OSError as e:
+            QMessageBox.critical(self, "Export log", str(e))
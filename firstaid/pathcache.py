@@ -0,0 +1,50 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+import os
+
+
+class PathCache:
+    """Cache of canonical paths (real path, normalized) keyed by the raw file name
+    as found in code objects' co_filename.
+
+    os.path.realpath() does a syscall for every path component, which is too much
+    to do for each traced event (especially on network file systems). Code objects
+    have absolute file names, so the canonical path of a raw name only changes
+    if symlinks change on the disk - call invalidate() in such case."""
+
+    def __init__(self):
+        self.paths = {}
+        self.hits = 0
+        self.misses = 0
+
+    def canonical(self, filename):
+        try:
+            path = self.paths[filename]
+        except KeyError:
+            self.misses += 1
+            path = os.path.normpath(os.path.realpath(filename))
+            self.paths[filename] = path
+            return path
+        self.hits += 1
+        return path
+
+    def invalidate(self):
+        self.paths.clear()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats_text(self):
+        return "Path cache: {} entries, {} hits, {} misses ({:.1f}% hit rate)".format(
+            len(self.paths), self.hits, self.misses, self.hit_rate() * 100
+        )
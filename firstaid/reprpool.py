@@ -0,0 +1,272 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Evaluation of repr() of variables that does not freeze the GUI when some
+__repr__ is slow (ORM objects, lazy proxies...). Pure Python objects are handled
+by a small pool of worker threads, Qt objects must stay in the main thread - they
+are evaluated a few at a time from the event loop."""
+
+import collections
+import concurrent.futures
+import itertools
+import queue
+import threading
+import time
+
+from qgis.PyQt import sip  # pylint: disable=import-error
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
+
+from .valuerepr import failed_repr
+
+WORKERS = 4
+TIMEOUT = 2.0  # seconds until a value that is still being evaluated is marked
+MAIN_THREAD_BUDGET = 0.02  # seconds of evaluation of Qt objects per event loop pass
+SLOW_REPR = 0.2  # Qt classes with repr slower than this are not evaluated anymore
+STUCK_TIME = 10.0  # seconds until a worker busy with one value is replaced
+MAX_STUCK_WORKERS = 16  # stuck workers replaced at most, then workers are not used
+CONTAINER_TYPES = (dict, list, tuple, set, frozenset, collections.deque)
+# values looked at to find out whether a value holds Qt objects - as deep as
+# ValueRepr goes, if there are more of them, the value is evaluated in main thread
+CHECK_DEPTH = 3
+CHECK_BUDGET = 1000
+
+# values of these types are cheap to evaluate right away
+FAST_TYPES = (type(None), bool, int, float, complex, str, bytes)
+
+PENDING_TEXT = "…"
+TIMED_OUT_TEXT = "<timed out>"
+SLOW_CLASS_TEXT = "<not evaluated: slow repr>"
+
+
+def call_safely(function, value):
+    try:
+        return function(value)
+    except Exception as e:
+        return failed_repr(value, e)
+
+
+def attribute_values(value):
+    """values of attributes of an object - without calling its __getattr__ or
+    properties, it may be a lazy proxy"""
+    try:
+        attrs = object.__getattribute__(value, "__dict__")
+    except Exception:
+        attrs = {}
+    values = list(attrs.values()) if isinstance(attrs, dict) else []
+    for cls in type(value).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for slot in (slots,) if isinstance(slots, str) else slots:
+            try:
+                values.append(object.__getattribute__(value, slot))
+            except Exception:
+                pass
+    return values
+
+
+def needs_main_thread(value, complete=False):
+    """Whether the repr of the value may use Qt objects - they are not thread safe.
+    Containers and Python objects are looked into, e.g. a list of layers or a class
+    wrapping a geometry. Only pure Python values are evaluated in workers.
+    With complete=False only the part shown by ValueRepr needs to be pure Python,
+    otherwise values too big to be checked are evaluated in main thread."""
+    budget = CHECK_BUDGET
+    pending = [(value, CHECK_DEPTH)]
+    while pending:
+        value, depth = pending.pop()
+        if isinstance(value, sip.simplewrapper):
+            return True
+        if type(value) in FAST_TYPES:
+            continue
+        if depth == 0:
+            if complete:
+                return True
+            continue
+        try:
+            if isinstance(value, dict):
+                if complete and len(value) > budget:
+                    return True
+                children = itertools.chain.from_iterable(
+                    itertools.islice(value.items(), budget)
+                )
+            elif isinstance(value, CONTAINER_TYPES):
+                if complete and len(value) > budget:
+                    return True
+                children = itertools.islice(value, budget)
+            else:
+                children = attribute_values(value)
+            for child in children:
+                budget -= 1
+                if budget < 0:
+                    return True  # too big to check, main thread is safe
+                pending.append((child, depth - 1))
+        except Exception:
+            return True  # e.g. changed meanwhile
+    return False
+
+
+class ReprWorker(threading.Thread):
+    """Daemon thread evaluating values from the pool's queue - a __repr__ that never
+    returns does not keep QGIS from exiting"""
+
+    def __init__(self, tasks):
+        threading.Thread.__init__(self, name="FirstAidRepr", daemon=True)
+        self.tasks = tasks
+        self.started = None  # when evaluation of the current value started
+        self.value_type = None
+        self.retired = False  # stuck and replaced - exits when (if ever) done
+
+    def run(self):
+        while not self.retired:
+            future, value, function = self.tasks.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            self.value_type = type(value)
+            self.started = time.monotonic()
+            try:
+                future.set_result(call_safely(function, value))
+            finally:
+                self.started = None
+
+
+class ReprPool(QObject):
+    """Evaluates function(value) for values shown in views. Results of values that
+    are not evaluated right away are delivered with the ready signal."""
+
+    ready = pyqtSignal(object, str)  # key given to evaluate(), text
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+        self.tasks = queue.Queue()  # (future, value, function) for workers
+        self.workers = None  # worker threads are started on first use
+        self.stuck_workers = 0
+        self.pending = {}  # key -> time when evaluation in a worker started
+        self.main_queue = collections.deque()  # (key, value, function) of Qt objects
+        self.slow_classes = set()
+        self.ready.connect(self.on_ready)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(250)
+        self.timer.timeout.connect(self.check_timeouts)
+
+    def submit(self, value, function):
+        if self.workers is None:
+            self.workers = [self.start_worker() for _ in range(WORKERS)]
+        future = concurrent.futures.Future()
+        if not self.workers:  # all of them got stuck
+            future.set_result(TIMED_OUT_TEXT)
+        else:
+            self.tasks.put((future, value, function))
+        return future
+
+    def start_worker(self):
+        worker = ReprWorker(self.tasks)
+        worker.start()
+        return worker
+
+    def replace_stuck_workers(self):
+        """Workers busy with one value for too long are left alone and others take
+        their place. Values of the same class are not evaluated anymore (unless
+        it is a container - the slow value is somewhere inside)."""
+        if not self.workers:
+            return
+        now = time.monotonic()
+        for worker in list(self.workers):
+            started = worker.started
+            if started is None or now - started < STUCK_TIME:
+                continue
+            worker.retired = True
+            self.workers.remove(worker)
+            if worker.value_type not in CONTAINER_TYPES:
+                self.slow_classes.add(worker.value_type)
+            self.stuck_workers += 1
+            if self.stuck_workers <= MAX_STUCK_WORKERS:
+                self.workers.append(self.start_worker())
+
+    def evaluate(self, key, value, function):
+        """Text of the value - returned right away for simple values. Otherwise None
+        is returned and the text comes with the ready signal (possibly even before
+        this returns)."""
+        if type(value) in FAST_TYPES:
+            return call_safely(function, value)
+        if type(value) in self.slow_classes:
+            return SLOW_CLASS_TEXT
+
+        if needs_main_thread(value):
+            if not self.main_queue:
+                QTimer.singleShot(0, self.process_main_queue)
+            self.main_queue.append((key, value, function))
+            return None
+
+        future = self.submit(value, function)
+        if future.done():  # e.g. no workers are left
+            return future.result()
+        self.pending[key] = time.monotonic()
+        if not self.timer.isActive():
+            self.timer.start()
+        # emitted from the worker thread, delivered in the main thread - or right
+        # away if the worker has just finished (the text comes before we return)
+        future.add_done_callback(lambda f: self.ready.emit(key, f.result()))
+        return None
+
+    def evaluate_all(self, values, function, timeout=TIMEOUT):
+        """Texts of all values at once (e.g. for copying to clipboard) - waits for
+        the workers at most the given time, texts still missing are marked"""
+        futures = [
+            None if needs_main_thread(v, complete=True) else self.submit(v, function)
+            for v in values
+        ]
+        texts = [
+            call_safely(function, v) if f is None else None
+            for v, f in zip(values, futures)
+        ]
+        deadline = time.monotonic() + timeout
+        for i, future in enumerate(futures):
+            if future is None:
+                continue
+            try:
+                texts[i] = future.result(max(deadline - time.monotonic(), 0))
+            except concurrent.futures.TimeoutError:
+                texts[i] = TIMED_OUT_TEXT
+        self.replace_stuck_workers()
+        return texts
+
+    def process_main_queue(self):
+        start = time.perf_counter()
+        while self.main_queue and time.perf_counter() - start < MAIN_THREAD_BUDGET:
+            key, value, function = self.main_queue.popleft()
+            if type(value) in self.slow_classes:
+                self.ready.emit(key, SLOW_CLASS_TEXT)
+                continue
+            value_start = time.perf_counter()
+            text = call_safely(function, value)
+            if time.perf_counter() - value_start > SLOW_REPR:
+                self.slow_classes.add(type(value))
+            self.ready.emit(key, text)
+        if self.main_queue:
+            QTimer.singleShot(0, self.process_main_queue)
+
+    def on_ready(self, key, text):
+        self.pending.pop(key, None)
+
+    def check_timeouts(self):
+        """values that take too long are marked - the text is still updated
+        if the evaluation finishes later"""
+        now = time.monotonic()
+        for key, started in list(self.pending.items()):
+            if now - started > TIMEOUT:
+                del self.pending[key]
+                self.ready.emit(key, TIMED_OUT_TEXT)
+        self.replace_stuck_workers()
+        if not self.pending and not any(w.started for w in self.workers or ()):
+            self.timer.stop()
+
+
+repr_pool = ReprPool()
@@ -0,0 +1,67 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Reading of source files for the debugger. Small files are read at once,
+large ones (e.g. generated resources_rc.py) are memory-mapped and read in chunks
+of whole lines by a worker thread, so that the GUI does not freeze."""
+
+import mmap
+import os
+
+from qgis.PyQt.QtCore import QThread, pyqtSignal
+
+BACKGROUND_LOAD_SIZE = 256 * 1024  # files bigger than this are loaded in background
+CHUNK_SIZE = 256 * 1024  # approximate size of chunks of large files
+
+
+def is_large_file(filename):
+    return os.path.getsize(filename) > BACKGROUND_LOAD_SIZE
+
+
+def read_source(filename):
+    with open(filename, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def iter_source_chunks(filename, chunk_size=CHUNK_SIZE):
+    """Yield the file's content as text chunks that end at line boundaries"""
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # empty files cannot be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            size = len(data)
+            while start < size:
+                end = data.find(b"\n", min(start + chunk_size, size - 1))
+                end = size if end == -1 else end + 1
+                yield data[start:end].decode("utf-8", errors="replace")
+                start = end
+
+
+class SourceLoader(QThread):
+    """Reads a large source file in a worker thread - chunks are delivered
+    to the GUI thread with chunkLoaded signal"""
+
+    chunkLoaded = pyqtSignal(str)
+    loadingFailed = pyqtSignal(str)
+
+    def __init__(self, filename, parent=None):
+        QThread.__init__(self, parent)
+        self.filename = filename
+
+    def run(self):
+        try:
+            for chunk in iter_source_chunks(self.filename):
+                if self.isInterruptionRequested():
+                    return
+                self.chunkLoaded.emit(chunk)
+        except (OSError, ValueError) as e:
+            self.loadingFailed.emit(str(e))
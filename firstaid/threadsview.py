@@ -0,0 +1,97 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+import os
+import sys
+import threading
+
+from qgis.PyQt.QtCore import Qt
+from qgis.PyQt.QtWidgets import (
+    QListWidget,
+    QListWidgetItem,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+
+class ThreadsView(QWidget):
+    """List of threads running Python code - tracing of worker threads
+    (QgsTask, QThread, processing algorithms) is opt-in by checking them"""
+
+    def __init__(self, debugger, parent=None):
+        QWidget.__init__(self, parent)
+        self.debugger = debugger
+
+        self.list_threads = QListWidget()
+        self.list_threads.itemChanged.connect(self.on_item_changed)
+        button_refresh = QPushButton("Refresh")
+        button_refresh.clicked.connect(self.refresh)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.list_threads)
+        layout.addWidget(button_refresh)
+        self.setLayout(layout)
+
+        self.refresh()
+
+    def refresh(self):
+        if not self.debugger.supports_threads():
+            self.setEnabled(False)
+            self.setToolTip(
+                "Tracing of worker threads needs Python 3.12 or newer "
+                "(or the sys.monitoring backend)"
+            )
+
+        names = {t.ident: t.name for t in threading.enumerate()}
+        frames = sys._current_frames()
+
+        # forget threads that have finished
+        for thread_id in list(self.debugger.traced_threads):
+            if thread_id not in frames:
+                self.debugger.set_thread_traced(thread_id, False)
+
+        self.list_threads.blockSignals(True)
+        self.list_threads.clear()
+        for thread_id, frame in sorted(frames.items()):
+            text = "{} ({}) - {} [{}:{}]".format(
+                names.get(thread_id, "Thread"),
+                thread_id,
+                frame.f_code.co_name,
+                os.path.basename(frame.f_code.co_filename),
+                frame.f_lineno,
+            )
+            if thread_id == self.debugger.step_thread and self.debugger.stopped:
+                text += " - stopped"
+            item = QListWidgetItem(text)
+            item.setData(Qt.ItemDataRole.UserRole, thread_id)
+            if thread_id == self.debugger.main_thread_id:
+                item.setFlags(Qt.ItemFlag.ItemIsEnabled)  # always traced
+            else:
+                item.setFlags(
+                    Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable
+                )
+            item.setCheckState(
+                Qt.CheckState.Checked
+                if thread_id in self.debugger.traced_threads
+                else Qt.CheckState.Unchecked
+            )
+            self.list_threads.addItem(item)
+        self.list_threads.blockSignals(False)
+
+    def showEvent(self, event):
+        self.refresh()  # not kept up to date while hidden
+        QWidget.showEvent(self, event)
+
+    def on_item_changed(self, item):
+        thread_id = item.data(Qt.ItemDataRole.UserRole)
+        traced = item.checkState() == Qt.CheckState.Checked
+        self.debugger.set_thread_traced(thread_id, traced)
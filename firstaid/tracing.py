@@ -0,0 +1,249 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Tracing backends of the debugger.
+
+A backend decides which code gets line events and passes them to
+Debugger.line_event() - the stopping logic itself is shared by all backends.
+"""
+
+import sys
+import threading
+
+
+def arm_back_frames(frame, trace_function, is_traceable):
+    """Make sure the callers of a stopped frame get line events so that stepping
+    can continue there after return (they may have been called untraced)"""
+    frame = frame.f_back
+    while frame is not None:
+        if frame.f_trace is None and is_traceable(frame.f_code):
+            frame.f_trace = trace_function
+        frame = frame.f_back
+
+
+class SetTraceBackend:
+    """Classic backend built on sys.settrace(): a Python callback is called for
+    every call event and for line events of the frames we return a local tracer for.
+
+    sys.settrace() only applies to the calling thread. Worker threads can only be
+    reached with threading.settrace_all_threads() (Python >= 3.12): each thread then
+    runs thread_gate() once and keeps tracing only if the user picked it."""
+
+    name = "settrace"
+    supports_threads = hasattr(threading, "settrace_all_threads")
+
+    def __init__(self, debugger):
+        self.debugger = debugger
+        self.all_threads = False  # whether the gate has been set for all threads
+
+    def install(self, enabled):
+        """attach (or fully detach) the global trace function"""
+        if self.supports_threads:
+            if enabled and len(self.debugger.traced_threads) > 1:
+                threading.settrace_all_threads(self.thread_gate)
+                self.all_threads = True
+            elif self.all_threads:
+                threading.settrace_all_threads(None)
+                self.all_threads = False
+        sys.settrace(self.trace_function if enabled else None)
+
+    def release(self):
+        if self.all_threads:
+            threading.settrace_all_threads(None)
+            self.all_threads = False
+        sys.settrace(None)
+
+    def thread_gate(self, frame, event, arg):
+        """first global trace call in a thread: keep tracing only picked threads"""
+        if threading.get_ident() in self.debugger.traced_threads:
+            sys.settrace(self.trace_function)
+            return self.trace_function(frame, event, arg)
+        sys.settrace(None)
+        return None
+
+    def reset(self):
+        """breakpoints have changed - nothing cached here"""
+        pass
+
+    def stopped(self, frame):
+        arm_back_frames(frame, self.trace_function, self.debugger.is_traceable)
+
+    def trace_function(self, frame, event, arg):
+        """to be used for sys.trace"""
+        if event == "call":  # arg is always None
+            # we need to return tracing function for this frame - either None or this function...
+
+            if not self.debugger.stepping:
+                # only frames that may hit a breakpoint need line events
+                if self.debugger.code_has_breakpoint(frame.f_code):
+                    return self.trace_function
+                return None
+
+            if not self.debugger.is_traceable(frame.f_code):
+                return None  # do not trace this file
+            return self.trace_function
+
+        elif event == "line":  # arg is always None
+            self.debugger.line_event(frame)
+
+        elif event == "return":  # arg is return value
+            if self.debugger.next_step is not None:
+                self.debugger.return_event(frame)
+
+
+class MonitoringBackend:
+    """Backend built on sys.monitoring (PEP 669, Python >= 3.12).
+
+    LINE events are enabled only for code objects that contain breakpoints
+    (decided once per code object on its first PY_START) or globally while
+    stepping into. Step over / out only enables local events for the code of the
+    stepped frame. Locations that can never stop are disabled, so they cost nothing
+    until the breakpoints change or the next step starts."""
+
+    name = "monitoring"
+    supports_threads = True  # events are global - callbacks filter the threads
+
+    def __init__(self, debugger):
+        self.debugger = debugger
+        self.tool_id = sys.monitoring.DEBUGGER_ID
+        self.active = False  # whether we hold the tool id
+        self.armed_codes = set()  # code objects with breakpoints - local LINE events
+        self.step_code = None  # code of the frame being stepped over / out
+        self.step_lines = False  # whether we need line events of step_code
+
+    @staticmethod
+    def is_available():
+        return (
+            hasattr(sys, "monitoring")
+            and sys.monitoring.get_tool(sys.monitoring.DEBUGGER_ID) is None
+        )
+
+    def install(self, enabled):
+        """attach (or fully detach) the monitoring callbacks. Raises ValueError
+        if the tool id has been taken by somebody else meanwhile."""
+        mon = sys.monitoring
+        if not enabled:
+            self.release()
+            return
+
+        if not self.active:
+            mon.use_tool_id(self.tool_id, "First Aid")
+            mon.register_callback(self.tool_id, mon.events.PY_START, self.on_py_start)
+            mon.register_callback(self.tool_id, mon.events.LINE, self.on_line)
+            mon.register_callback(self.tool_id, mon.events.PY_RETURN, self.on_return)
+            mon.register_callback(self.tool_id, mon.events.PY_YIELD, self.on_return)
+            mon.register_callback(self.tool_id, mon.events.PY_UNWIND, self.on_return)
+            self.active = True
+
+        events = mon.events.PY_START
+        if self.debugger.stepping:
+            events |= mon.events.LINE
+        next_step = self.debugger.next_step
+        if next_step is not None:
+            events |= mon.events.PY_UNWIND  # not available as a local event
+            self.set_step_code(next_step[1].f_code, next_step[0] == "over")
+        else:
+            self.set_step_code(None, False)
+        mon.set_events(self.tool_id, events)
+        # re-enable locations disabled while breakpoints or stepping were different
+        mon.restart_events()
+
+    def release(self):
+        if not self.active:
+            return
+        mon = sys.monitoring
+        self.set_step_code(None, False)
+        self.reset()
+        mon.set_events(self.tool_id, 0)
+        for event in (
+            mon.events.PY_START,
+            mon.events.LINE,
+            mon.events.PY_RETURN,
+            mon.events.PY_YIELD,
+            mon.events.PY_UNWIND,
+        ):
+            mon.register_callback(self.tool_id, event, None)
+        mon.free_tool_id(self.tool_id)
+        self.active = False
+
+    def reset(self):
+        """breakpoints have changed - code objects need to be armed again"""
+        armed_codes, self.armed_codes = self.armed_codes, set()
+        if not self.active:
+            return
+        # code already running (e.g. run to cursor in the stopped frame) does not
+        # get PY_START again - arm it right away
+        for frame in (self.debugger.current_frame, sys._getframe(1)):
+            while frame is not None:
+                self.arm_code(frame.f_code)
+                frame = frame.f_back
+        for code in armed_codes - self.armed_codes:
+            self.update_local_events(code)
+
+    def set_step_code(self, code, lines):
+        previous_code, self.step_code = self.step_code, code
+        self.step_lines = lines
+        if previous_code is not None and previous_code is not code:
+            self.update_local_events(previous_code)
+        if code is not None:
+            self.update_local_events(code)
+
+    def update_local_events(self, code):
+        events = 0
+        if code in self.armed_codes:
+            events |= sys.monitoring.events.LINE
+        if code is self.step_code:
+            events |= sys.monitoring.events.PY_RETURN | sys.monitoring.events.PY_YIELD
+            if self.step_lines:
+                events |= sys.monitoring.events.LINE
+        sys.monitoring.set_local_events(self.tool_id, code, events)
+
+    def stopped(self, frame):
+        pass
+
+    def arm_code(self, code):
+        if code not in self.armed_codes and self.debugger.code_has_breakpoint(code):
+            self.armed_codes.add(code)
+            self.update_local_events(code)
+
+    def on_py_start(self, code, instruction_offset):
+        self.arm_code(code)
+        return sys.monitoring.DISABLE
+
+    def on_line(self, code, line_number):
+        if threading.get_ident() not in self.debugger.traced_threads:
+            return None  # not DISABLE - the location is shared with traced threads
+
+        debugger = self.debugger
+        if debugger.stepping:
+            if not debugger.is_traceable(code):
+                return sys.monitoring.DISABLE
+        elif line_number not in debugger.breakpoint_lines(code):
+            if code is not self.step_code:
+                return sys.monitoring.DISABLE
+            # recursive calls share the code with the stepped frame - do not disable
+
+        debugger.line_event(sys._getframe(1))
+
+    def on_return(self, code, instruction_offset, arg):
+        """PY_RETURN / PY_YIELD / PY_UNWIND while stepping over or out"""
+        if threading.get_ident() not in self.debugger.traced_threads:
+            return None
+        if self.debugger.next_step is not None:
+            self.debugger.return_event(sys._getframe(1))
+
+
+def create_backend(debugger, name="auto"):
+    """Pick the tracing backend at runtime: sys.monitoring if the Python version
+    supports it and no other debugger is using it, sys.settrace otherwise"""
+    if name in ("auto", MonitoringBackend.name) and MonitoringBackend.is_available():
+        return MonitoringBackend(debugger)
+    return SetTraceBackend(debugger)
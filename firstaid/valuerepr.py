@@ -0,0 +1,100 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Text of values shown in the variables view. Containers are abbreviated
+(only the first items, a few levels deep) and the text is cut to a budget
+of characters, so that a list with a million items costs as much as a short one.
+A __repr__ that raises does not break the view either."""
+
+import reprlib
+
+try:
+    from qgis.core import QgsGeometry, QgsWkbTypes
+except ImportError:  # e.g. in benchmarks outside of QGIS
+    QgsGeometry = None
+
+MAX_CHARS = 1000  # default budget of characters of a shown value
+
+
+def geometry_repr(value):
+    """QgsGeometry's own repr exports the whole WKT"""
+    if value.isNull():
+        return "<QgsGeometry: null>"
+    return "<QgsGeometry: {}, {} vertices>".format(
+        QgsWkbTypes.displayString(value.wkbType()), value.constGet().nCoordinates()
+    )
+
+
+# short texts for classes whose repr() is expensive - key = class, value = function
+# returning the text for a value. Registered here and not with the handlers, which
+# are loaded only when a value of their library is shown (e.g. geometries in a list)
+custom_reprs = {}
+if QgsGeometry is not None:
+    custom_reprs[QgsGeometry] = geometry_repr
+
+
+def failed_repr(value, e):
+    return "<{} object - repr failed: {}: {}>".format(
+        type(value).__name__, type(e).__name__, e
+    )
+
+
+def full_repr(value):
+    """complete repr of the value, e.g. for copying to clipboard"""
+    try:
+        return repr(value)
+    except Exception as e:
+        return failed_repr(value, e)
+
+
+class ValueRepr(reprlib.Repr):
+    """reprlib with limits suitable for the variables view"""
+
+    def __init__(self, max_chars=MAX_CHARS):
+        reprlib.Repr.__init__(self)
+        self.maxlevel = 3
+        self.maxtuple = self.maxlist = self.maxarray = 100
+        self.maxdict = 50
+        self.maxset = self.maxfrozenset = self.maxdeque = 50
+        self.set_max_chars(max_chars)
+
+    def set_max_chars(self, max_chars):
+        self.max_chars = max_chars
+        self.maxstring = self.maxlong = self.maxother = max_chars
+
+    def repr_instance(self, x, level):
+        try:
+            for cls in type(x).__mro__:
+                if cls in custom_reprs:
+                    s = custom_reprs[cls](x)
+                    break
+            else:
+                s = repr(x)
+        except Exception as e:
+            return failed_repr(x, e)
+        return self.truncate(s, self.maxother)
+
+    def truncate(self, s, max_chars=None):
+        if max_chars is None:
+            max_chars = self.max_chars
+        if len(s) <= max_chars:
+            return s
+        return s[: max(max_chars - 3, 0)] + "..."
+
+    def repr(self, x):
+        try:
+            s = reprlib.Repr.repr(self, x)
+        except Exception as e:  # e.g. __len__ of a container that raises
+            return failed_repr(x, e)
+        return self.truncate(s)
+
+
+value_repr = ValueRepr()
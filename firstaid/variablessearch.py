@@ -0,0 +1,259 @@
+# -----------------------------------------------------------
+# Copyright (C) 2015 Martin Dobias
+# -----------------------------------------------------------
+# Licensed under the terms of GNU GPL 2
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# ---------------------------------------------------------------------
+
+"""Search in the variables tree. The tree is flattened into an index of
+(path, text) entries bit by bit from a timer, so that the GUI stays responsive.
+Items that have been expanded are indexed as they are (values only if they have
+been shown already - nothing is evaluated for the search), containers that have
+not been expanded yet are walked directly (no tree items are made for them) up to
+a limited depth and number of values."""
+
+import time
+
+from qgis.PyQt.QtCore import QSettings, Qt, QTimer
+from qgis.PyQt.QtWidgets import QHBoxLayout, QLabel, QLineEdit, QVBoxLayout, QWidget
+
+from .reprpool import FAST_TYPES, PENDING_TEXT
+from .variablesview import (
+    SEQUENCE_TYPES,
+    SequenceBucketItem,
+    find_handler,
+)
+
+SEARCH_DEPTH = 3  # levels of containers searched below the expanded items
+SEARCH_MAX_VALUES = 200000  # values indexed at most
+SLICE_TIME = 0.01  # seconds of indexing / matching per timer tick
+VALUE_TEXT_CHARS = 200  # only the start of values is searched
+
+
+def value_text(value):
+    """text of simple values, others are only found by their name"""
+    if type(value) in FAST_TYPES:
+        return str(value)[:VALUE_TEXT_CHARS]
+    return ""
+
+
+def entry_text(name, text):
+    return "{} = {}".format(name, text).lower()
+
+
+def value_children(value):
+    """(name, value) pairs of a container without making tree items for them -
+    names are the same as the items would have"""
+    if find_handler(type(value)) is not None:
+        return ()  # custom handlers make tree items - only searched when expanded
+    if isinstance(value, dict):
+        return ((str(k), v) for k, v in list(value.items()))
+    if isinstance(value, SEQUENCE_TYPES):
+        return ((str(i), v) for i, v in enumerate(value))
+    if isinstance(getattr(value, "__dict__", None), dict):
+        return ((str(k), v) for k, v in list(vars(value).items()))
+    return ()
+
+
+class SearchIndex:
+    """Entries (path, lowercase text) of the tree, path is a tuple of names
+    of the items from the root. The index is built step by step with build()."""
+
+    def __init__(self, root_item, max_depth=SEARCH_DEPTH, max_values=SEARCH_MAX_VALUES):
+        self.entries = []
+        self.max_depth = max_depth
+        self.max_values = max_values
+        self.truncated = False  # stopped because of max_values
+        self.walker = self.walk_item(root_item, ())
+
+    @property
+    def done(self):
+        return self.walker is None
+
+    def build(self, time_budget):
+        """add entries until the time runs out"""
+        if self.walker is None:
+            return
+        deadline = time.perf_counter() + time_budget
+        entries = self.entries
+        for entry in self.walker:
+            entries.append(entry)
+            if len(entries) >= self.max_values:
+                self.truncated = True
+                break
+            if len(entries) % 256 == 0 and time.perf_counter() > deadline:
+                return
+        self.walker = None
+
+    def walk_item(self, item, path):
+        for child in item.children:
+            child_path = path + (child.name,)
+            if isinstance(child, SequenceBucketItem):
+                if child.populated_children:
+                    yield from self.walk_item(child, child_path)
+                else:
+                    yield from self.walk_bucket(child, child_path)
+                continue
+            # values are not evaluated for the search (that would queue reprs of
+            # the whole tree), only texts of values shown already are used
+            text = child.cached_val
+            if text is None or text == PENDING_TEXT:
+                text = value_text(child.value)
+            yield child_path, entry_text(child.name, text)
+            if child.populated_children:
+                yield from self.walk_item(child, child_path)
+            elif child.has_children:
+                yield from self.walk_value(child.value, child_path, 1)
+
+    def walk_bucket(self, bucket, path):
+        """items of a bucket that has not been expanded"""
+        try:
+            items = bucket.get_items(bucket.value, bucket.start, bucket.stop)
+            for i, child in enumerate(items, bucket.start):
+                child_path = path + (str(i),)
+                yield child_path, entry_text(i, value_text(child))
+                yield from self.walk_value(child, child_path, 1)
+        except Exception:
+            return  # e.g. the sequence has changed meanwhile
+
+    def walk_value(self, value, path, depth):
+        if depth > self.max_depth:
+            return
+        try:
+            for name, child in value_children(value):
+                child_path = path + (name,)
+                yield child_path, entry_text(name, value_text(child))
+                yield from self.walk_value(child, child_path, depth + 1)
+        except Exception:
+            return  # e.g. the container has changed meanwhile
+
+
+class VariablesSearchWidget(QWidget):
+    """Search box above a VariablesView. Enter jumps to the next match."""
+
+    def __init__(self, view, parent=None):
+        QWidget.__init__(self, parent)
+        self.view = view
+        self.index = None
+        self.matches = []  # paths of matching entries
+        self.matched_entries = 0  # entries of the index checked so far
+        self.current_match = -1
+
+        settings = QSettings()
+        self.max_depth = int(
+            settings.value("/plugins/firstaid/search-depth", SEARCH_DEPTH)
+        )
+        self.max_values = int(
+            settings.value("/plugins/firstaid/search-max-values", SEARCH_MAX_VALUES)
+        )
+
+        self.edit_search = QLineEdit()
+        self.edit_search.setPlaceholderText("Search variables (Enter for next match)")
+        self.edit_search.setClearButtonEnabled(True)
+        self.edit_search.textChanged.connect(self.on_text_changed)
+        self.edit_search.returnPressed.connect(self.next_match)
+        self.label_matches = QLabel()
+
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.edit_search)
+        top_layout.addWidget(self.label_matches)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(top_layout)
+        layout.addWidget(view)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.search_step)
+
+        view.modelReplaced.connect(self.on_model_replaced)
+        self.on_model_replaced()
+
+    def search_text(self):
+        return self.edit_search.text().strip().lower()
+
+    def on_model_replaced(self):
+        model = self.view.model()
+        if model is not None:
+            model.variablesUpdated.connect(self.reset_index)
+            model.search_text = self.search_text()
+        self.reset_index()
+
+    def reset_index(self):
+        """the tree has changed - the index is built again when needed"""
+        self.index = None
+        self.restart_matching()
+
+    def on_text_changed(self):
+        model = self.view.model()
+        if model is not None:
+            model.search_text = self.search_text()
+            self.view.viewport().update()  # highlight of matching items
+        self.restart_matching()
+
+    def restart_matching(self):
+        self.matches = []
+        self.matched_entries = 0
+        self.current_match = -1
+        if not self.search_text() or self.view.model() is None:
+            self.timer.stop()
+            self.label_matches.clear()
+            return
+        if self.index is None:
+            self.index = SearchIndex(
+                self.view.model().root_item, self.max_depth, self.max_values
+            )
+        self.timer.start()
+        self.search_step()
+
+    def search_step(self):
+        """index a bit more of the tree and look for matches in the new entries"""
+        index = self.index
+        if index is None:
+            self.timer.stop()
+            return
+        index.build(SLICE_TIME)
+        text = self.search_text()
+        entries = index.entries
+        for i in range(self.matched_entries, len(entries)):
+            if text in entries[i][1]:
+                self.matches.append(entries[i][0])
+        self.matched_entries = len(entries)
+
+        status = "{} matches".format(len(self.matches))
+        if not index.done:
+            status += " (searching…)"
+        elif index.truncated:
+            status += " (search limit reached)"
+        self.label_matches.setText(status)
+        if index.done:
+            self.timer.stop()
+
+    def next_match(self):
+        if not self.matches:
+            return
+        self.current_match = (self.current_match + 1) % len(self.matches)
+        self.show_match(self.matches[self.current_match])
+
+    def show_match(self, path):
+        """expand the items on the path (making only them) and select the match"""
+        model = self.view.model()
+        index = model.item_index(model.root_item)
+        for name in path:
+            index = model.child_index(index, name)
+            if not index.isValid():
+                return  # the tree has changed meanwhile
+            self.view.expand(index.parent())
+        self.view.setCurrentIndex(index)
+        self.view.scrollTo(index, self.view.ScrollHint.PositionAtCenter)
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape:
+            self.edit_search.clear()
+        else:
+            QWidget.keyPressEvent(self, event)
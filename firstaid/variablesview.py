@@ -8,6 +8,10 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 # ---------------------------------------------------------------------
+import collections
+import importlib
+import itertools
+
 from qgis.PyQt.QtWidgets import (
     QStyledItemDelegate,
     QStyleOptionViewItem,
@@ -18,35 +22,134 @@ from qgis.PyQt.QtWidgets import (
     QAction,
 )
 
-from qgis.PyQt.QtCore import Qt, QAbstractItemModel, QModelIndex, pyqtSignal
-from qgis.PyQt.QtGui import QPen
+from qgis.PyQt.QtCore import (
+    Qt,
+    QAbstractItemModel,
+    QModelIndex,
+    QObject,
+    QSettings,
+    pyqtSignal,
+)
+from qgis.PyQt.QtGui import QBrush, QColor, QPen
+
+from .reprpool import FAST_TYPES, PENDING_TEXT, TIMED_OUT_TEXT, repr_pool
+from .valuerepr import full_repr, value_repr
 
 
 Role_Name = Qt.ItemDataRole.UserRole + 1
 Role_Type = Qt.ItemDataRole.UserRole + 2
 Role_Value = Qt.ItemDataRole.UserRole + 3
 Role_Parent = Qt.ItemDataRole.UserRole + 4
+Role_FullValue = Qt.ItemDataRole.UserRole + 5
 
 # database of handlers for custom classes to allow better introspection
 # key = class, value = method with two arguments: 1. value, 2. parent item
 # see handlers_qgis.py for how the handlers are implemented
 custom_class_handlers = {}
 
+# how an item at a position in a container of a custom class is accessed in code
+# (items named by position are accessed with [] otherwise)
+# key = class, value = format string with the position, e.g. ".iloc[{}]"
+custom_index_formats = {}
+
+# modules with handlers for types of a library: key = top-level package of the
+# types' module. The handlers are loaded the first time a type from the package
+# shows up - the plugin never imports e.g. numpy just for the variables view.
+handler_modules = {
+    "qgis": ".handlers_qgis",
+    "PyQt5": ".handlers_qt",
+    "PyQt6": ".handlers_qt",
+    "numpy": ".handlers_numpy",
+    "pandas": ".handlers_pandas",
+}
+
+# class -> handler resolved through its MRO (None if there is none)
+_resolved_handlers = {}
+
+
+def load_handler_modules(cls):
+    """import modules with handlers for the class and its base classes"""
+    loaded = False
+    for base in cls.__mro__:
+        package = (getattr(base, "__module__", None) or "").partition(".")[0]
+        handlers_module = handler_modules.pop(package, None)
+        if handlers_module is None:
+            continue
+        try:
+            importlib.import_module(handlers_module, __package__)
+        except ImportError:
+            continue  # e.g. handlers for a different version of the library
+        # the same module handles more packages (PyQt5 / PyQt6)
+        for key, module in list(handler_modules.items()):
+            if module == handlers_module:
+                del handler_modules[key]
+        loaded = True
+    if loaded:
+        _resolved_handlers.clear()  # classes may have new handlers
+
+
+def find_handler(cls):
+    """Custom handler for the class or its nearest base class, or None"""
+    try:
+        return _resolved_handlers[cls]
+    except KeyError:
+        pass
+    load_handler_modules(cls)
+    handler = None
+    for base in cls.__mro__:
+        if base in custom_class_handlers:
+            handler = custom_class_handlers[base]
+            break
+    _resolved_handlers[cls] = handler
+    return handler
+
+
+# containers shown item by item - large ones are split into buckets of items
+SEQUENCE_TYPES = (list, tuple, range, collections.deque, set, frozenset)
+BUCKET_SIZE = 1000
+
 
 class VariablesTreeItem:
+    # there may be many thousands of items - no __dict__ for each of them
+    __slots__ = (
+        "name",
+        "value",
+        "has_children",
+        "populated_children",
+        "cached_val",
+        "parent",
+        "children",
+        "row",
+    )
+
     def __init__(self, name, value, parent=None):
         self.name = name
         self.value = value
         self.has_children = False
         self.populated_children = False
+        self.cached_val = None  # abbreviated repr, computed when first shown
 
         self.parent = parent
-        self.children = []
+        self.children = ()  # a list is only allocated when the first child is added
+        self.row = 0  # index in parent's children, so that the model finds it quickly
         if parent:
+            if not parent.children:
+                parent.children = []
+            self.row = len(parent.children)
             parent.children.append(self)
 
     def val(self):
-        return repr(self.value)
+        if self.cached_val is None:
+            # slow values are evaluated in background, see on_repr_ready() - it may
+            # set the text already during evaluate(), so it is not overwritten
+            self.cached_val = PENDING_TEXT
+            text = repr_pool.evaluate(self, self.value, value_repr.repr)
+            if text is not None:
+                self.cached_val = text
+        return self.cached_val
+
+    def full_val(self):
+        return repr_pool.evaluate_all([self.value], full_repr)[0]
 
     def text(self):
         return "{} = {{{}}} {}".format(self.name, self.type_name(), self.val())
@@ -57,8 +160,16 @@ class VariablesTreeItem:
     def populate_children(self):
         assert False  # not used in base class
 
+    def release(self):
+        """the item is not shown anymore - e.g. work in background for it
+        may be canceled"""
+        for child in self.children:
+            child.release()
+
 
 class DictTreeItem(VariablesTreeItem):
+    __slots__ = ()
+
     def __init__(self, name, value, parent=None):
         VariablesTreeItem.__init__(self, name, value, parent)
 
@@ -78,9 +189,41 @@ class DictTreeItem(VariablesTreeItem):
         # sort items alphabetically
         if all_strs:
             self.children = sorted(self.children, key=lambda x: x.name)
+            for row, child in enumerate(self.children):
+                child.row = row
+
+
+def slice_items(sequence, start, stop):
+    if isinstance(sequence, (set, frozenset, collections.deque)):
+        return itertools.islice(sequence, start, stop)
+    return sequence[start:stop]
+
+
+def populate_range(parent, sequence, start, stop, get_items=slice_items):
+    """Add items of the sequence in the range [start, stop) to the parent - directly
+    if there are only a few of them, otherwise grouped into buckets of up to
+    BUCKET_SIZE items (or buckets of buckets for really huge sequences).
+    get_items(sequence, start, stop) returns an iterable with the items."""
+    size = stop - start
+    if size <= BUCKET_SIZE:
+        for i, v in enumerate(get_items(sequence, start, stop), start):
+            make_item(str(i), v, parent)
+        return
+
+    span = BUCKET_SIZE
+    while size > span * BUCKET_SIZE:
+        span *= BUCKET_SIZE
+    for bucket_start in range(start, stop, span):
+        SequenceBucketItem(
+            sequence, bucket_start, min(bucket_start + span, stop), parent, get_items
+        )
 
 
 class ListTreeItem(VariablesTreeItem):
+    """Lists, tuples, ranges, deques and sets"""
+
+    __slots__ = ()
+
     def __init__(self, name, value, parent=None):
         VariablesTreeItem.__init__(self, name, value, parent)
 
@@ -90,38 +233,67 @@ class ListTreeItem(VariablesTreeItem):
 
     def populate_children(self):
         self.populated_children = True
-        for i, v in enumerate(self.value):
-            make_item(str(i), v, self)
+        populate_range(self, self.value, 0, len(self.value))
+
+
+class SequenceBucketItem(VariablesTreeItem):
+    """Range of items of a large sequence - they are only created when expanded"""
+
+    __slots__ = ("start", "stop", "get_items")
+
+    def __init__(self, sequence, start, stop, parent, get_items=slice_items):
+        VariablesTreeItem.__init__(
+            self, "[{}..{}]".format(start, stop - 1), sequence, parent
+        )
+        self.start = start
+        self.stop = stop
+        self.get_items = get_items
+        self.has_children = True
+
+    def val(self):
+        return "{} items".format(self.stop - self.start)
+
+    def full_val(self):
+        return self.val()
+
+    def populate_children(self):
+        self.populated_children = True
+        populate_range(self, self.value, self.start, self.stop, self.get_items)
 
 
 class ObjectTreeItem(VariablesTreeItem):
+    __slots__ = ("custom_handler",)
+
     def __init__(self, name, value, parent=None):
         VariablesTreeItem.__init__(self, name, value, parent)
 
-        self.custom_handler = None
-        if (
-            hasattr(self.value, "__class__")
-            and self.value.__class__ in custom_class_handlers
-        ):
-            self.custom_handler = custom_class_handlers[self.value.__class__]
+        self.custom_handler = find_handler(type(value))
 
-        self.has_children = len(value.__dict__) > 0 or self.custom_handler is not None
+        self.has_children = (
+            self.custom_handler is not None or len(getattr(value, "__dict__", ())) > 0
+        )
 
     def populate_children(self):
         self.populated_children = True
-        for i, v in list(self.value.__dict__.items()):
-            make_item(str(i), v, self)
-
         if self.custom_handler is not None:
+            # the handler knows better what is interesting, internals are skipped
             self.custom_handler(self.value, self)
+            return
+
+        for i, v in list(self.value.__dict__.items()):
+            make_item(str(i), v, self)
 
 
 class ScalarTreeItem(VariablesTreeItem):
+    __slots__ = ()
+
     def __init__(self, name, value, parent):
         VariablesTreeItem.__init__(self, name, value, parent)
 
 
 class StringTreeItem(VariablesTreeItem):
+    __slots__ = ()
+
     def _is_internal(self):
         return len(self.value.split("\n")) > 0 and self.name == "__str__"
 
@@ -131,21 +303,183 @@ class StringTreeItem(VariablesTreeItem):
 
     def val(self):
         if self._is_internal():
-            return str(self.value)
+            return value_repr.truncate(self.value)
         else:
             return VariablesTreeItem.val(self)
 
+    def full_val(self):
+        if self._is_internal():
+            return self.value
+        else:
+            return VariablesTreeItem.full_val(self)
+
     def populate_children(self):
         self.populated_children = True
         make_item("__str__", self.value, self)
 
 
+class ItemUpdates(QObject):
+    """Items changed outside of models (e.g. when a background task has finished)
+    are announced here, models showing them update the views"""
+
+    itemChanged = pyqtSignal(object)
+    # children are appended to an item that may be shown already, see append_children()
+    childrenAboutToBeAdded = pyqtSignal(object, int)  # item, number of children
+    childrenAdded = pyqtSignal(object)
+
+
+item_updates = ItemUpdates()
+
+
+def append_children(parent, children):
+    """Append items made meanwhile (see make_unparented_item()) to an item whose
+    children are shown already - e.g. when a background task has finished"""
+    if not children:
+        return
+    item_updates.childrenAboutToBeAdded.emit(parent, len(children))
+    if not parent.children:
+        parent.children = []
+    for child in children:
+        child.parent = parent
+        child.row = len(parent.children)
+        parent.children.append(child)
+    item_updates.childrenAdded.emit(parent)
+
+
+def on_repr_ready(item, text):
+    item.cached_val = text
+    item_updates.itemChanged.emit(item)
+
+
+repr_pool.ready.connect(on_repr_ready)
+
+
+class PendingTreeItem(VariablesTreeItem):
+    """Value that is being computed in background (e.g. in a QgsTask) - a placeholder
+    is shown until set_value() is called"""
+
+    __slots__ = ("pending_text",)
+
+    def __init__(self, name, parent, pending_text="computing…"):
+        VariablesTreeItem.__init__(self, name, None, parent)
+        self.pending_text = pending_text
+
+    def val(self):
+        if self.pending_text is not None:
+            return self.pending_text
+        return VariablesTreeItem.val(self)
+
+    def type_name(self):
+        if self.pending_text is not None:
+            return "pending"
+        return VariablesTreeItem.type_name(self)
+
+    def set_value(self, value):
+        self.value = value
+        self.pending_text = None
+        self.cached_val = None
+        item_updates.itemChanged.emit(self)
+
+    def set_status(self, text):
+        """e.g. that computing the value has failed"""
+        self.pending_text = text
+        item_updates.itemChanged.emit(self)
+
+
+class OnDemandTreeItem(VariablesTreeItem):
+    """Value that is expensive to get - it is computed only when the item is
+    expanded, e.g. full WKT of a huge geometry"""
+
+    __slots__ = ("function",)
+
+    def __init__(self, name, function, parent):
+        VariablesTreeItem.__init__(self, name, None, parent)
+        self.function = function
+        self.has_children = True
+
+    def val(self):
+        if self.function is not None:
+            return "expand to compute"
+        return VariablesTreeItem.val(self)
+
+    def type_name(self):
+        if self.function is not None:
+            return "on demand"
+        return VariablesTreeItem.type_name(self)
+
+    def populate_children(self):
+        self.populated_children = True
+        try:
+            self.value = self.function()
+        except Exception as e:
+            self.value = e
+        self.function = None
+        self.cached_val = None
+        make_item("value", self.value, self)
+        item_updates.itemChanged.emit(self)
+
+
+CHANGE_CHECK_TIMEOUT = 0.1  # seconds waited for texts of variables when stepping
+
+
+def state_repr(value):
+    """text compared to find out whether a value has been changed in place - repr
+    of an object does not show its attributes, so they are added"""
+    text = value_repr.repr(value)
+    attrs = getattr(value, "__dict__", None)
+    if isinstance(attrs, dict) and attrs:
+        text += value_repr.repr(attrs)
+    return text
+
+
+def variable_states(variables):
+    """Identity and text of values of the variables (item name -> state) to find out
+    which of them have changed between two debugger steps. Texts are evaluated by
+    the repr pool, values that are slow to evaluate are compared by identity only."""
+    states = {}
+    names, values = [], []
+    for name, value in variables.items():
+        if type(value) in FAST_TYPES or type(value) in repr_pool.slow_classes:
+            states[str(name)] = (id(value), None)
+        else:
+            names.append(str(name))
+            values.append(value)
+    texts = repr_pool.evaluate_all(values, state_repr, CHANGE_CHECK_TIMEOUT)
+    for name, value, text in zip(names, values, texts):
+        states[name] = (id(value), text)
+    return states
+
+
+def state_changed(old_state, new_state):
+    if old_state is None or old_state[0] != new_state[0]:
+        return True
+    if TIMED_OUT_TEXT in (old_state[1], new_state[1]):
+        return False  # not known, only the identity is compared
+    return old_state[1] != new_state[1]
+
+
+def item_slots(item):
+    return [
+        slot for cls in type(item).__mro__ for slot in getattr(cls, "__slots__", ())
+    ]
+
+
+def make_unparented_item(name, value):
+    """item made the same way as a child of a container (e.g. dicts get __len__),
+    but not added to any parent"""
+    item = make_item(name, value, VariablesTreeItem("", None))
+    item.parent = None
+    return item
+
+
 def make_item(name, value, parent=None):
     """Generate VariablesTreeItem instance for the given variable"""
     # print "MAKING", name, value
-    if isinstance(value, dict):
+    if find_handler(type(value)) is not None:
+        return ObjectTreeItem(name, value, parent)
+    elif isinstance(value, dict):
         return DictTreeItem(name, value, parent)
-    elif isinstance(value, list):
+    elif isinstance(value, SEQUENCE_TYPES):
         return ListTreeItem(name, value, parent)
     elif hasattr(value, "__dict__"):
         return ObjectTreeItem(name, value, parent)
@@ -211,24 +545,238 @@ class VariablesDelegate(QStyledItemDelegate):
 
 
 class VariablesItemModel(QAbstractItemModel):
+    CHANGED_BRUSH = QBrush(QColor(255, 255, 180))
+    MATCH_BRUSH = QBrush(QColor(190, 225, 255))
+
+    variablesUpdated = pyqtSignal()
+
     def __init__(self, root_item, parent=None):
         QAbstractItemModel.__init__(self, parent)
         self.root_item = root_item
+        self.search_text = ""  # lowercase, items containing it are highlighted
+        item_updates.itemChanged.connect(self.on_item_changed)
+        item_updates.childrenAboutToBeAdded.connect(self.on_children_about_to_be_added)
+        item_updates.childrenAdded.connect(self.on_children_added)
+        self.adding_children = False
+
+        # item name -> state of the variable's value when last shown
+        self.states = variable_states(root_item.value)
+        self.changed_items = set()  # top-level items changed by the last update
+
+    def update_variables(self, variables):
+        """Show new values of the variables (e.g. after a step in the same function).
+        Only rows of variables that have changed (also in place) are updated, the rest
+        (including expanded items) stays as it is. Changed variables are highlighted."""
+        root = self.root_item
+        root.value = variables
+        root.has_children = len(variables) > 0
+        old_states, self.states = self.states, variable_states(variables)
+        changed_names = {
+            name
+            for name, state in self.states.items()
+            if state_changed(old_states.get(name), state)
+        }
+        previously_changed, self.changed_items = self.changed_items, set()
+        if not root.populated_children:
+            # e.g. there were no variables at the first stop in the function
+            self.fetchMore(QModelIndex())
+            self.changed_items = {
+                item for item in root.children if item.name in changed_names
+            }
+            self.variablesUpdated.emit()
+            return
+
+        keys = list(variables)
+        if all(isinstance(key, str) for key in keys):
+            keys.sort()  # the same order as in DictTreeItem
+        names = set(str(key) for key in keys)
+
+        # removed variables
+        for row in range(len(root.children) - 1, -1, -1):
+            if root.children[row].name not in names:
+                self.remove_top_item(row)
+
+        for row, key in enumerate(keys):
+            name, value = str(key), variables[key]
+            if row < len(root.children) and root.children[row].name == name:
+                item = root.children[row]
+                if name in changed_names:
+                    item = self.update_item(item, value)
+            else:  # new variable
+                item = make_unparented_item(name, value)
+                self.insert_top_item(row, item)
+            if name in changed_names:
+                self.changed_items.add(item)
+        # left over if the order of variables has changed
+        while len(root.children) > len(keys):
+            self.remove_top_item(len(root.children) - 1)
+
+        # not highlighted anymore
+        for item in previously_changed - self.changed_items:
+            if item.parent is root and root.children[item.row] is item:
+                index = self.createIndex(item.row, 0, item)
+                self.dataChanged.emit(index, index)
+        self.variablesUpdated.emit()
+
+    def remove_top_item(self, row):
+        root = self.root_item
+        self.beginRemoveRows(QModelIndex(), row, row)
+        root.children.pop(row).release()
+        for item in root.children[row:]:
+            item.row -= 1
+        self.endRemoveRows()
+
+    def insert_top_item(self, row, item):
+        root = self.root_item
+        if not root.children:
+            root.children = []
+        self.beginInsertRows(QModelIndex(), row, row)
+        item.parent = root
+        root.children.insert(row, item)
+        for i in range(row, len(root.children)):
+            root.children[i].row = i
+        self.endInsertRows()
+
+    def update_item(self, item, value):
+        """Set a new value of a top-level item. The item stays in place, so that it
+        is still expanded (its children are made again when the view fetches them).
+        Returns the item in the row."""
+        index = self.createIndex(item.row, 0, item)
+        old_children = item.children
+        if item.populated_children and item.children:
+            self.beginRemoveRows(index, 0, len(item.children) - 1)
+            item.children = ()
+            item.populated_children = False
+            self.endRemoveRows()
+        for child in old_children:
+            child.release()
+
+        new_item = make_unparented_item(item.name, value)
+        if type(new_item) is not type(item):  # e.g. a number has become a list
+            row = item.row
+            self.remove_top_item(row)
+            self.insert_top_item(row, new_item)
+            return new_item
+
+        for slot in item_slots(item):
+            if slot not in ("name", "parent", "row"):
+                setattr(item, slot, getattr(new_item, slot))
+        for child in item.children:
+            child.parent = item
+        self.dataChanged.emit(index, index)
+        return item
+
+    def shows_item(self, item):
+        """whether the item is in the tree of this model (and not removed from it)
+        with its row shown"""
+        while item.parent is not None:
+            parent = item.parent
+            if (
+                not parent.populated_children
+                or item.row >= len(parent.children)
+                or parent.children[item.row] is not item
+            ):
+                return False
+            item = parent
+        return item is self.root_item
+
+    def on_item_changed(self, item):
+        if not self.shows_item(item):
+            return  # not our item
+        index = self.createIndex(item.row, 0, item)
+        self.dataChanged.emit(index, index)
+
+    def on_children_about_to_be_added(self, item, count):
+        if item.populated_children and self.shows_item(item):
+            first = len(item.children)
+            self.beginInsertRows(self.item_index(item), first, first + count - 1)
+            self.adding_children = True
+
+    def on_children_added(self, item):
+        if self.adding_children:
+            self.adding_children = False
+            self.endInsertRows()
 
     def columnCount(self, parent):
         return 1
 
+    def item(self, index):
+        return self.root_item if not index.isValid() else index.internalPointer()
+
+    def item_index(self, item):
+        if item.parent is None:
+            return QModelIndex()
+        return self.createIndex(item.row, 0, item)
+
+    def child_index(self, parent, name):
+        """Index of the child item with the given name - children are fetched if
+        needed. Items of large sequences are looked up in the bucket with them."""
+        parent_item = self.item(parent)
+        if self.canFetchMore(parent):
+            self.fetchMore(parent)
+        for child in parent_item.children:
+            if child.name == name:
+                return self.item_index(child)
+        if name.isdigit():
+            for child in parent_item.children:
+                if (
+                    isinstance(child, SequenceBucketItem)
+                    and child.start <= int(name) < child.stop
+                ):
+                    return self.child_index(self.item_index(child), name)
+        return QModelIndex()
+
+    def item_path(self, index):
+        """names of the items from the top to the item at the index"""
+        path = []
+        item = self.item(index)
+        while item.parent is not None:
+            path.append(item.name)
+            item = item.parent
+        return tuple(reversed(path))
+
+    def path_index(self, path):
+        """index of the item with the given path (or an invalid index)"""
+        index = QModelIndex()
+        for name in path:
+            index = self.child_index(index, name)
+            if not index.isValid():
+                break
+        return index
+
+    def matches_search(self, item):
+        text = self.search_text
+        if not text or isinstance(item, SequenceBucketItem):
+            return False
+        return text in item.name.lower() or text in item.val().lower()
+
     def rowCount(self, parent):
         if parent.column() > 0:
             return 0
 
-        parent_item = (
-            self.root_item if not parent.isValid() else parent.internalPointer()
-        )
-        if not parent_item.populated_children:  # lazy loading
-            parent_item.populate_children()
+        parent_item = self.item(parent)
+        if not parent_item.populated_children:
+            return 0  # children are created in fetchMore() when the item is expanded
         return len(parent_item.children)
 
+    def canFetchMore(self, parent):
+        parent_item = self.item(parent)
+        return parent_item.has_children and not parent_item.populated_children
+
+    def fetchMore(self, parent):
+        parent_item = self.item(parent)
+        if parent_item.populated_children:
+            return
+        parent_item.populate_children()
+        # the new children are inserted in one go (rowCount() was 0 until now)
+        children, parent_item.children = parent_item.children, []
+        if not children:
+            parent_item.children = children
+            return
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        parent_item.children = children
+        self.endInsertRows()
+
     def hasChildren(self, index):
         if not index.isValid():
             return True
@@ -249,6 +797,13 @@ class VariablesItemModel(QAbstractItemModel):
             return item.parent
         elif role == Role_Value:
             return item.val()
+        elif role == Role_FullValue:
+            return item.full_val()
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            if item in self.changed_items:
+                return self.CHANGED_BRUSH
+            if self.matches_search(item):
+                return self.MATCH_BRUSH
 
         # return
 
@@ -261,10 +816,7 @@ class VariablesItemModel(QAbstractItemModel):
         if not self.hasIndex(row, column, parent):
             return QModelIndex()
 
-        parent_item = (
-            self.root_item if not parent.isValid() else parent.internalPointer()
-        )
-        child_item = parent_item.children[row]
+        child_item = self.item(parent).children[row]
         return self.createIndex(row, column, child_item)
 
     def parent(self, index):
@@ -275,8 +827,7 @@ class VariablesItemModel(QAbstractItemModel):
         if parent_item.parent is None:
             return QModelIndex()
 
-        parent_index_in_grandparent = parent_item.parent.children.index(parent_item)
-        return self.createIndex(parent_index_in_grandparent, 0, parent_item)
+        return self.createIndex(parent_item.row, 0, parent_item)
 
     def headerData(self, section, orientation, role):
         if (
@@ -289,6 +840,7 @@ class VariablesItemModel(QAbstractItemModel):
 
 class VariablesView(QTreeView):
     object_picked = pyqtSignal(str)
+    modelReplaced = pyqtSignal()
 
     def __init__(self, parent=None):
         QTreeView.__init__(self, parent)
@@ -297,18 +849,94 @@ class VariablesView(QTreeView):
         self.setExpandsOnDoubleClick(False)
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self._open_menu)
+        self.pending_frame = None  # frame whose locals are to be shown once visible
+        self.shown_code = None  # code of the function whose locals are shown
 
-    def setVariables(self, variables):
-        model = VariablesItemModel(DictTreeItem("", variables), self)
+        # values longer than this are cut in the view (copying gives the full value)
+        value_repr.set_max_chars(
+            int(QSettings().value("/plugins/firstaid/repr-max-chars", 1000))
+        )
+
+    def replaceModel(self, model):
+        """set the model and release the previous one"""
+        old_model = self.model()
         self.setModel(model)
+        if old_model is not None:
+            old_model.root_item.release()
+            old_model.deleteLater()
+        self.modelReplaced.emit()
+
+    def setVariables(self, variables):
+        self.pending_frame = None
+        self.shown_code = None
+        self.replaceModel(VariablesItemModel(DictTreeItem("", variables), self))
+
+    def setFrame(self, frame):
+        """Show local variables of the frame. They are only read when the view is
+        visible - there is no point in doing it for a hidden dock while stepping.
+        When still in the same function, only the changed variables are updated."""
+        if not self.isVisible():
+            self.replaceModel(None)
+            self.shown_code = None
+            self.pending_frame = frame
+            return
+
+        if frame.f_code is self.shown_code and self.model() is not None:
+            self.updateVariables(frame.f_locals)
+        else:
+            self.setVariables(frame.f_locals)
+            self.shown_code = frame.f_code
+
+    def updateVariables(self, variables):
+        """update the model with new values - expanded and selected items stay"""
+        model = self.model()
+        expanded = self.expanded_paths(QModelIndex())
+        current = model.item_path(self.currentIndex())
+        scroll = self.verticalScrollBar().value()
+
+        model.update_variables(variables)
+
+        for path in expanded:
+            index = model.path_index(path)
+            if not index.isValid():
+                continue
+            if not self.isExpanded(index):
+                self.expand(index)
+            elif model.canFetchMore(index):  # children of a changed variable
+                model.fetchMore(index)
+        if current:
+            self.setCurrentIndex(model.path_index(current))
+        self.verticalScrollBar().setValue(scroll)
+
+    def expanded_paths(self, parent):
+        """paths of the expanded items, parents before their children"""
+        model = self.model()
+        paths = []
+        for row in range(model.rowCount(parent)):
+            index = model.index(row, 0, parent)
+            if self.isExpanded(index):
+                paths.append(model.item_path(index))
+                paths += self.expanded_paths(index)
+        return paths
+
+    def showEvent(self, event):
+        if self.pending_frame is not None:
+            frame, self.pending_frame = self.pending_frame, None
+            self.setFrame(frame)
+        QTreeView.showEvent(self, event)
 
     def on_item_double_click(self, index):
-        name = index.data(Role_Name)
-        parent = index.data(Role_Parent)
+        item = index.internalPointer()
+        while isinstance(item, SequenceBucketItem):
+            item = item.parent  # buckets are not a part of the expression
+        name = item.name
+        parent = item.parent
+        while isinstance(parent, SequenceBucketItem):
+            parent = parent.parent
         if parent.name:
-            name = self.format_item_name_for_container_access(name, parent)
+            parent_name = self.get_variable_parent_name(parent)
             self.object_picked.emit(
-                "{}{}".format(self.get_variable_parent_name(parent)[1:], name)
+                self.format_item_access(parent_name, name, parent)[1:]
             )
         else:
             self.object_picked.emit(name)
@@ -338,7 +966,7 @@ class VariablesView(QTreeView):
 
     def copy_variable_value(self):
         indexes = self.selectedIndexes()
-        val = indexes[0].data(Role_Value)
+        val = indexes[0].data(Role_FullValue)
         cb = QApplication.clipboard()
         cb.clear(mode=cb.Clipboard)
         cb.setText(val, mode=cb.Clipboard)
@@ -354,25 +982,39 @@ class VariablesView(QTreeView):
         cb.setText(val, mode=cb.Clipboard)
 
     def get_variable_parent_name(self, parent):
+        if isinstance(parent, SequenceBucketItem):
+            return self.get_variable_parent_name(parent.parent)
         if parent.parent is not None:
             parent_name = self.get_variable_parent_name(parent.parent)
-            this_name = self.format_item_name_for_container_access(
-                parent.name, parent.parent
-            )
-            return "{}{}".format(parent_name, this_name)
+            return self.format_item_access(parent_name, parent.name, parent.parent)
 
         else:
             return parent.name
 
-    def format_item_name_for_container_access(self, name, parent):
-        if isinstance(parent.value, list) or isinstance(parent.value, tuple):
-            name = "[{}]".format(name)
-        elif isinstance(parent.value, dict) and parent.parent is not None:
-            name = "['{}']".format(name)
-        else:
-            name = ".{}".format(name)
+    def format_item_access(self, parent_name, name, parent):
+        """code of the parent (with a dot in front) extended to access its item"""
+        while isinstance(parent, SequenceBucketItem):
+            parent = parent.parent
+        if isinstance(parent.value, (set, frozenset)):
+            # sets cannot be indexed - the item is picked by its position in the
+            # order of iteration, the same as in the view (if the set is unchanged)
+            return ".list({})[{}]".format(parent_name[1:], name)
+        return parent_name + self.format_item_name_for_container_access(name, parent)
 
-        return name
+    def format_item_name_for_container_access(self, name, parent):
+        if isinstance(parent.value, dict) and parent.parent is not None:
+            keys = parent.value
+            if name not in keys and name.isdigit() and int(name) in keys:
+                return "[{}]".format(name)
+            return "[{!r}]".format(name)  # a string key, even "5"
+        if isinstance(parent.value, (list, tuple, range, collections.deque)):
+            return "[{}]".format(name)
+        if name.isdigit():  # position in a sequence of some library
+            for cls in type(parent.value).__mro__:
+                if cls in custom_index_formats:
+                    return custom_index_formats[cls].format(name)
+            return "[{}]".format(name)  # e.g. ndarray
+        return ".{}".format(name)
 
 
 if __name__ == "__main__":